@@ -5,13 +5,15 @@ Provides endpoints for camera control, image capture, and capture-to-predict flo
 import io
 import requests as http_requests
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, Response
 from typing import Dict, Any
 from services.camera_service import camera_service
 from services.upload_service import upload_service
-from config.settings import settings
+from config.settings import get_settings
 from utils.logger import setup_logger
 
+settings = get_settings()
 logger = setup_logger(__name__, level=settings.log_level)
 
 router = APIRouter(prefix="/api/v1", tags=["camera"])
@@ -23,9 +25,9 @@ async def capture_and_upload(background_tasks: BackgroundTasks) -> Dict[str, Any
     Capture image from camera and upload to Server 2.
 
     This endpoint:
-    1. Captures image from camera (or uses fallback)
+    1. Captures image from camera (or uses fallback) into memory
     2. Uploads to Server 2 (Raspberry Pi 5)
-    3. Cleans up local file (if configured)
+    3. Keeps the image on disk only if the upload fails
 
     Returns:
         Dictionary with capture and upload status
@@ -38,22 +40,23 @@ async def capture_and_upload(background_tasks: BackgroundTasks) -> Dict[str, Any
     try:
         # Step 1: Capture image
         logger.info("Capturing image...")
-        image_path = camera_service.capture()
+        captured = await run_in_threadpool(camera_service.capture_jpeg)
 
-        if not image_path:
+        if not captured:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to capture image"
             )
+        image_bytes, filename = captured
 
         # Step 2: Upload to Server 2
-        logger.info(f"Uploading {image_path.name} to Server 2...")
-        upload_response = upload_service.upload_and_cleanup(image_path)
+        logger.info(f"Uploading {filename} to Server 2...")
+        upload_response = await run_in_threadpool(upload_service.upload_bytes, image_bytes, filename)
 
         return {
             "status": "success",
             "message": "Image captured and uploaded successfully",
-            "image_name": image_path.name,
+            "image_name": filename,
             "server2_response": upload_response
         }
 
@@ -84,10 +87,10 @@ async def get_status() -> Dict[str, Any]:
 
     try:
         # Get camera status
-        camera_status = camera_service.get_status()
+        camera_status = await run_in_threadpool(camera_service.get_status)
 
         # Test Server 2 connection
-        server2_connected = upload_service.test_connection()
+        server2_connected = await run_in_threadpool(upload_service.test_connection)
 
         return {
             "service": settings.service_name,
@@ -109,16 +112,21 @@ async def get_status() -> Dict[str, Any]:
 
 
 @router.get("/health")
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Dict[str, Any]:
     """
     Simple health check endpoint for Docker/Kubernetes.
 
+    Also reports the upload circuit breaker, so an open circuit (Server 2
+    unreachable, uploads failing fast) is visible without reading logs. It
+    does not change the status: the camera service itself is still up.
+
     Returns:
-        Dictionary with health status
+        Dictionary with health status and upload circuit breaker state
     """
     return {
         "status": "healthy",
-        "service": settings.service_name
+        "service": settings.service_name,
+        "upload_circuit": upload_service.breaker_state()
     }
 
 
@@ -137,7 +145,7 @@ async def test_camera() -> Dict[str, Any]:
     logger.info("Camera test requested")
 
     try:
-        image_path = camera_service.capture()
+        image_path = await run_in_threadpool(camera_service.capture)
 
         if not image_path:
             raise HTTPException(
@@ -178,17 +186,12 @@ async def capture_image_only() -> Response:
     logger.info("Capture-image request (for inference)")
 
     try:
-        image_path = camera_service.capture()
+        # Captured straight into memory, no temp file to read back and delete
+        captured = await run_in_threadpool(camera_service.capture_jpeg)
 
-        if not image_path:
+        if not captured:
             raise HTTPException(status_code=500, detail="Failed to capture image")
-
-        # Read image bytes
-        image_bytes = image_path.read_bytes()
-        filename = image_path.name
-
-        # Cleanup temp file
-        camera_service.cleanup(image_path)
+        image_bytes, filename = captured
 
         return Response(
             content=image_bytes,
@@ -218,8 +221,8 @@ async def test_upload() -> Dict[str, Any]:
     logger.info("Upload test requested")
 
     try:
-        # Test connection
-        connected = upload_service.test_connection()
+        # Test connection (always probe, this is an explicit test)
+        connected = await run_in_threadpool(upload_service.test_connection, refresh=True)
 
         if not connected:
             raise HTTPException(
@@ -253,18 +256,16 @@ async def button_capture_and_predict() -> Dict[str, Any]:
     logger.info("Button capture-and-predict triggered")
 
     try:
-        image_path = camera_service.capture()
-        if not image_path:
+        captured = await run_in_threadpool(camera_service.capture_jpeg)
+        if not captured:
             raise HTTPException(status_code=500, detail="Failed to capture image")
-
-        image_bytes = image_path.read_bytes()
-        filename = image_path.name
-        camera_service.cleanup(image_path)
+        image_bytes, filename = captured
 
         # Forward to inference service
         inference_url = settings.inference_url
         files = {"file": (filename, io.BytesIO(image_bytes), "image/jpeg")}
-        r = http_requests.post(
+        r = await run_in_threadpool(
+            http_requests.post,
             f"{inference_url}/api/v1/predict", files=files, timeout=60
         )
         r.raise_for_status()
@@ -2,6 +2,7 @@
 Configuration management for Server 1 (Camera Service - Raspberry Pi 3)
 Uses Pydantic Settings for type-safe environment variable handling
 """
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -27,6 +28,8 @@ class Settings(BaseSettings):
     camera_width: int = 1920
     camera_height: int = 1080
     camera_fps: int = 30
+    camera_fourcc: str = "MJPG"  # capture pixel format, empty = driver default
+    use_picamera2: bool = False  # Raspberry Pi camera via picamera2 (hardware JPEG)
 
     # Fallback image (for testing without camera)
     fallback_image_path: str = "sample.jpg"
@@ -37,9 +40,15 @@ class Settings(BaseSettings):
     # Server 2 (Raspberry Pi 5) connection
     server2_url: str = "http://localhost:8002"
     server2_upload_endpoint: str = "/api/v1/upload"
+    server2_upload_batch_endpoint: str = "/api/v1/upload/batch"
+    upload_batch_size: int = 16  # max images per batch request
     upload_timeout: int = 30  # seconds
+    upload_connect_timeout: float = 5.0  # seconds, TCP connect limit for single uploads (the response wait stays upload_timeout)
     upload_retries: int = 3
     upload_retry_delay: float = 2.0  # seconds (exponential backoff)
+    upload_retry_delay_cap: float = 60.0  # seconds, upper bound for a single backoff
+    upload_breaker_threshold: int = 5  # failed uploads in a row before failing fast
+    upload_breaker_reset_s: float = 30.0  # seconds to fail fast before probing Server 2 again
 
     # Local storage (temporary)
     temp_dir: Path = Path("/tmp/camera_captures")
@@ -51,24 +60,40 @@ class Settings(BaseSettings):
 
     # Health check
     health_check_enabled: bool = True
+    server2_health_ttl_s: float = 10.0  # seconds a Server 2 connection test result is reused
 
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        frozen=True  # built once per process, never mutated
     )
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Ensure temp directory exists
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
-
     @property
     def server2_upload_url(self) -> str:
         """Full upload URL for Server 2"""
         return f"{self.server2_url}{self.server2_upload_endpoint}"
 
+    @property
+    def server2_upload_batch_url(self) -> str:
+        """Full batch upload URL for Server 2"""
+        return f"{self.server2_url}{self.server2_upload_batch_endpoint}"
+
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Get the process-wide settings instance.
+
+    Settings are built on first use rather than at import time, so importing
+    this module has no side effects. The cache means the temp directory is
+    created once per process.
+
+    Returns:
+        Cached Settings instance
+    """
+    settings = Settings()
+    # Ensure temp directory exists
+    settings.temp_dir.mkdir(parents=True, exist_ok=True)
+    return settings
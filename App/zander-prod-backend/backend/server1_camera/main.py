@@ -2,13 +2,17 @@
 Main application entry point for Server 1 (Camera Service - Raspberry Pi 3)
 FastAPI application for PCB image capture and upload
 """
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from api.routes import router
-from config.settings import settings
+from services.camera_service import camera_service
+from services.upload_service import upload_service
+from config.settings import get_settings
 from utils.logger import setup_logger
 
+settings = get_settings()
 logger = setup_logger(__name__, level=settings.log_level)
 
 
@@ -23,10 +27,16 @@ async def lifespan(app: FastAPI):
     logger.info(f"Server 2 URL: {settings.server2_url}")
     logger.info(f"Camera enabled: {settings.use_camera}")
 
+    # Open keep-alive connections to Server 2 without delaying startup
+    warm_up_task = asyncio.create_task(asyncio.to_thread(upload_service.warm_up))
+
     yield
 
     # Shutdown
     logger.info(f"Shutting down {settings.service_name}")
+    warm_up_task.cancel()
+    camera_service.close()
+    upload_service.close()
 
 
 # Create FastAPI application
@@ -16,7 +16,6 @@ Wiring (active-low with internal pull-up):
 
 import os
 import sys
-import time
 import requests
 
 BUTTON_PIN = int(os.getenv("BUTTON_GPIO_PIN", "23"))  # BCM 23 = physischer Pin 16
@@ -26,6 +25,9 @@ SERVER1_URL = os.getenv("SERVER1_URL", "http://pcb-server1-camera:8001")
 CAPTURE_ENDPOINT = f"{SERVER1_URL}/api/v1/capture"
 INFERENCE_ENDPOINT = f"{SERVER1_URL}/api/v1/button-capture-predict"
 
+EDGE_BOUNCE_MS = 50     # Entprellzeit fuer die Flankenerkennung
+EDGE_TIMEOUT_MS = 1000  # wait_for_edge kehrt regelmaessig zurueck
+
 # Try to import RPi.GPIO; if unavailable, exit gracefully
 try:
     import RPi.GPIO as GPIO
@@ -48,6 +50,14 @@ def main():
 
     try:
         while True:
+            # Blockiert im Kernel bis zur naechsten Flanke (kein Polling).
+            # bouncetime uebernimmt das Entprellen, timeout erlaubt Ctrl+C.
+            channel = GPIO.wait_for_edge(
+                BUTTON_PIN, GPIO.BOTH, bouncetime=EDGE_BOUNCE_MS, timeout=EDGE_TIMEOUT_MS
+            )
+            if channel is None:
+                continue
+
             state = GPIO.input(BUTTON_PIN)
 
             # Button hat seinen Zustand geändert:
@@ -67,9 +77,6 @@ def main():
                     print("[Button Listener] Button LOSGELASSEN")
 
                 last_state = state
-                time.sleep(0.05)  # Entprellen
-
-            time.sleep(0.01)
 
     except KeyboardInterrupt:
         print("[Button Listener] Stop durch KeyboardInterrupt")
@@ -3,14 +3,32 @@ Camera Service for Server 1 (Camera Service)
 Handles image capture from camera or fallback image.
 Supports: laptop webcam (MacBook), USB cameras, or fallback test image.
 """
+import io
+import itertools
+import threading
 import cv2
+import numpy as np
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
-from config.settings import settings
+from typing import Optional, Tuple
+from config.settings import get_settings
 from utils.logger import setup_logger
 
+try:
+    # Raspberry Pi camera stack: ISP does debayering and JPEG encoding in hardware
+    from picamera2 import Picamera2
+except ImportError:
+    Picamera2 = None
 
+try:
+    # libjpeg-turbo bindings: NEON/SIMD JPEG encoder, several times faster
+    # than OpenCV's bundled libjpeg on ARM
+    from turbojpeg import TurboJPEG, TJSAMP_420
+except ImportError:
+    TurboJPEG = None
+
+
+settings = get_settings()
 logger = setup_logger(__name__, level=settings.log_level)
 
 
@@ -26,11 +44,35 @@ class CameraService:
         self.fallback_path = Path(settings.fallback_image_path)
         self.temp_dir = settings.temp_dir
 
+        # Capture filenames: process start timestamp + sequence number, unique
+        # even for several captures within the same second
+        self._capture_base = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._capture_seq = itertools.count()
+
+        # Picamera2 instance, opened on first capture and kept running
+        self._picam = None
+        self._picam_lock = threading.Lock()
+
+        # OpenCV camera, opened on first capture and kept open; captures run
+        # in the threadpool, so only one may use it at a time
+        self._cap = None
+        self._camera_lock = threading.Lock()
+
+        # JPEG encoder (libjpeg-turbo if available, else OpenCV)
+        self._turbojpeg = self._load_turbojpeg()
+
+        # Fallback image bytes, read from disk once
+        self._fallback_bytes: Optional[bytes] = None
+
         logger.info(
             f"CameraService initialized: use_camera={self.use_camera}, "
             f"index={self.camera_index}"
         )
 
+    def _next_capture_path(self) -> Path:
+        """Unique path in the temp dir for the next captured image."""
+        return self.temp_dir / f"capture_{self._capture_base}_{next(self._capture_seq):06d}.jpg"
+
     def capture(self) -> Optional[Path]:
         """
         Capture image from camera or use fallback.
@@ -39,7 +81,10 @@ class CameraService:
             Path to captured image, or None if capture failed
         """
         if self.use_camera:
-            image_path = self._capture_from_camera()
+            if settings.use_picamera2 and Picamera2 is not None:
+                image_path = self._capture_from_picamera()
+            else:
+                image_path = self._capture_from_camera()
             if image_path:
                 logger.info(f"Image captured from camera: {image_path}")
                 return image_path
@@ -50,72 +95,275 @@ class CameraService:
             logger.info("Camera disabled, using fallback image")
             return self._use_fallback()
 
+    def capture_jpeg(self) -> Optional[Tuple[bytes, str]]:
+        """
+        Capture image from camera or fallback and keep it in memory.
+
+        Used by the capture-and-upload/predict flows, which would otherwise
+        write the JPEG to the SD card only to read it straight back.
+        picamera2 returns the hardware-encoded JPEG; OpenCV frames are
+        encoded in the calling thread once the camera lock is released.
+
+        Returns:
+            Tuple of (JPEG bytes, filename), or None if capture failed
+        """
+        filename = self._next_capture_path().name
+
+        if self.use_camera:
+            if settings.use_picamera2 and Picamera2 is not None:
+                data = self._picamera_jpeg()
+            else:
+                data = self._camera_jpeg()
+            if data:
+                logger.info(f"Image captured from camera: {filename} ({len(data) / 1024:.1f} KB)")
+                return data, filename
+            logger.warning("Camera capture failed, falling back to sample image")
+        else:
+            logger.info("Camera disabled, using fallback image")
+
+        return self._fallback_jpeg(), filename
+
+    def _camera_jpeg(self) -> Optional[bytes]:
+        """
+        Grab a frame with OpenCV and JPEG-encode it.
+
+        Encoding runs in the calling (threadpool) thread after the camera
+        lock is released, so another capture can grab a frame while this
+        one is still being encoded.
+        """
+        with self._camera_lock:
+            frame = self._grab_frame()
+        if frame is None:
+            return None
+
+        try:
+            return self._encode_frame(frame)
+        except Exception as e:
+            logger.error(f"Camera capture exception: {e}", exc_info=True)
+            return None
+
     def _capture_from_camera(self) -> Optional[Path]:
         """
         Capture image from camera using OpenCV.
         Works with laptop webcam (index 0) or external USB cameras.
+
+        The camera lock is released as soon as the frame is grabbed, so
+        another capture can grab a frame while this one is being encoded.
+        """
+        data = self._camera_jpeg()
+        if data is None:
+            return None
+
+        image_path = self._next_capture_path()
+        image_path.write_bytes(data)
+        return image_path
+
+    def _capture_from_picamera(self) -> Optional[Path]:
         """
-        cap = None
+        Capture a still with picamera2 on Raspberry Pi.
+
+        The camera stays started between captures, and capture_file() writes
+        the JPEG produced by the ISP's hardware encoder, so no frame is
+        converted or encoded on the CPU.
+        """
+        image_path = self._next_capture_path()
+
         try:
-            cap = cv2.VideoCapture(self.camera_index)
+            with self._picam_lock:
+                self._started_picamera().capture_file(str(image_path))
 
-            if not cap.isOpened():
-                logger.error(f"Failed to open camera at index {self.camera_index}")
-                return None
+            return image_path
+
+        except Exception as e:
+            logger.error(f"Picamera2 capture exception: {e}", exc_info=True)
+            return None
+
+    def _picamera_jpeg(self) -> Optional[bytes]:
+        """
+        Capture a still with picamera2 into memory (hardware-encoded JPEG).
+        """
+        buffer = io.BytesIO()
+
+        try:
+            with self._picam_lock:
+                self._started_picamera().capture_file(buffer, format="jpeg")
+
+            return buffer.getvalue()
+
+        except Exception as e:
+            logger.error(f"Picamera2 capture exception: {e}", exc_info=True)
+            return None
+
+    def _started_picamera(self):
+        """Picamera2 instance, started on first use. Caller holds _picam_lock."""
+        if self._picam is None:
+            picam = Picamera2()
+            picam.configure(picam.create_still_configuration(
+                main={"size": (settings.camera_width, settings.camera_height)}
+            ))
+            picam.options["quality"] = 95
+            picam.start()
+            self._picam = picam
+            logger.info("Picamera2 started")
+
+        return self._picam
+
+    def close(self) -> None:
+        """Release the OpenCV camera and stop picamera2 if they are open."""
+        with self._camera_lock:
+            self._release_capture()
+
+        with self._picam_lock:
+            if self._picam is not None:
+                try:
+                    self._picam.stop()
+                    self._picam.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close Picamera2: {e}")
+                self._picam = None
+
+    def _open_capture(self) -> Optional["cv2.VideoCapture"]:
+        """
+        Open and configure the OpenCV camera. Caller holds _camera_lock.
+
+        Returns:
+            Opened capture, or None if the camera is not available
+        """
+        cap = cv2.VideoCapture(self.camera_index)
+
+        if not cap.isOpened():
+            cap.release()
+            logger.error(f"Failed to open camera at index {self.camera_index}")
+            return None
+
+        # Keep only the newest frame in the driver queue
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # MJPEG is compressed on the camera, far less USB/CPU load than YUYV
+        if settings.camera_fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*settings.camera_fourcc))
+
+        # Set resolution
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings.camera_width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings.camera_height)
+        cap.set(cv2.CAP_PROP_FPS, settings.camera_fps)
+
+        # Allow camera to warm up (important for webcams); grab() skips
+        # decoding the frames that are thrown away
+        for _ in range(5):
+            cap.grab()
+
+        logger.info(f"Camera opened at index {self.camera_index}")
+        return cap
+
+    def _release_capture(self) -> None:
+        """Release the OpenCV camera. Caller holds _camera_lock."""
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+            logger.debug("Camera released")
+
+    def _grab_frame(self) -> Optional[np.ndarray]:
+        """
+        Read one fresh frame from the camera. Caller holds _camera_lock.
 
-            # Set resolution
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings.camera_width)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings.camera_height)
-            cap.set(cv2.CAP_PROP_FPS, settings.camera_fps)
+        The device stays open between captures, so the V4L2 open and format
+        negotiation is paid once; after a failed read it is closed and
+        reopened on the next capture.
 
-            # Allow camera to warm up (important for webcams)
-            for _ in range(5):
-                cap.read()
+        Returns:
+            BGR frame, or None if the camera could not deliver one
+        """
+        try:
+            if self._cap is None:
+                self._cap = self._open_capture()
+                if self._cap is None:
+                    return None
 
-            ret, frame = cap.read()
+            # Drop the frame left in the driver buffer since the last capture
+            self._cap.grab()
+            ret = self._cap.grab()
+            frame = self._cap.retrieve()[1] if ret else None
 
             if not ret or frame is None:
                 logger.error("Failed to capture frame from camera")
+                self._release_capture()
                 return None
 
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            filename = f"capture_{timestamp}.jpg"
-            image_path = self.temp_dir / filename
+            return frame
 
-            # Save as JPEG (high quality for defect detection)
-            success = cv2.imwrite(
-                str(image_path),
+        except Exception as e:
+            logger.error(f"Camera capture exception: {e}", exc_info=True)
+            self._release_capture()
+            return None
+
+    @staticmethod
+    def _load_turbojpeg():
+        """TurboJPEG encoder if PyTurboJPEG and libturbojpeg are available."""
+        if TurboJPEG is None:
+            return None
+        try:
+            return TurboJPEG()
+        except Exception as e:
+            # Python package present but the shared library is missing
+            logger.warning(f"libjpeg-turbo unavailable, using OpenCV encoder: {e}")
+            return None
+
+    def _encode_frame(self, frame: np.ndarray) -> Optional[bytes]:
+        """
+        Encode frame as JPEG.
+        """
+        # Save as JPEG (high quality for defect detection)
+        if self._turbojpeg is not None:
+            buffer = self._turbojpeg.encode(frame, quality=95, jpeg_subsample=TJSAMP_420)
+        else:
+            success, encoded = cv2.imencode(
+                ".jpg",
                 frame,
                 [cv2.IMWRITE_JPEG_QUALITY, 95]
             )
 
             if not success:
-                logger.error(f"Failed to save image to {image_path}")
+                logger.error("Failed to encode captured frame")
                 return None
+            buffer = encoded.tobytes()
 
-            height, width = frame.shape[:2]
-            logger.debug(
-                f"Captured {width}x{height} image, size: "
-                f"{image_path.stat().st_size / 1024:.1f} KB"
-            )
-
-            return image_path
-
-        except Exception as e:
-            logger.error(f"Camera capture exception: {e}", exc_info=True)
-            return None
+        height, width = frame.shape[:2]
+        logger.debug(
+            f"Captured {width}x{height} image, size: "
+            f"{len(buffer) / 1024:.1f} KB"
+        )
 
-        finally:
-            if cap is not None:
-                cap.release()
-                logger.debug("Camera released")
+        return buffer
 
     def _use_fallback(self) -> Path:
         """
         Use fallback image for testing without camera.
         Creates a test image if none exists.
         """
+        self._ensure_fallback()
+
+        # Copy fallback to temp dir with unique name so uploads don't conflict
+        dest = self._next_capture_path()
+
+        import shutil
+        shutil.copy2(str(self.fallback_path), str(dest))
+
+        logger.info(f"Using fallback image: {self.fallback_path} -> {dest}")
+        return dest
+
+    def _fallback_jpeg(self) -> bytes:
+        """
+        Fallback image bytes, cached after the first read so the no-camera
+        path does no disk I/O per capture.
+        """
+        if self._fallback_bytes is None:
+            self._fallback_bytes = self._ensure_fallback().read_bytes()
+        return self._fallback_bytes
+
+    def _ensure_fallback(self) -> Path:
+        """
+        Path of the fallback image, creating a test image if none exists.
+        """
         if not self.fallback_path.exists():
             logger.warning(
                 f"Fallback image not found at {self.fallback_path}, "
@@ -128,16 +376,7 @@ class CameraService:
                 f"Fallback image not available at {self.fallback_path}"
             )
 
-        # Copy fallback to temp dir with unique name so uploads don't conflict
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"capture_{timestamp}.jpg"
-        dest = self.temp_dir / filename
-
-        import shutil
-        shutil.copy2(str(self.fallback_path), str(dest))
-
-        logger.info(f"Using fallback image: {self.fallback_path} -> {dest}")
-        return dest
+        return self.fallback_path
 
     def _create_test_image(self) -> None:
         """
@@ -145,13 +384,9 @@ class CameraService:
         Simulates a PCB board appearance.
         """
         try:
-            import numpy as np
-
             width, height = 1920, 1080
-            image = np.zeros((height, width, 3), dtype=np.uint8)
-
-            # Dark green background (simulating PCB)
-            image[:] = (20, 40, 20)
+            # Dark green background (simulating PCB), filled in one pass
+            image = np.full((height, width, 3), (20, 40, 20), dtype=np.uint8)
 
             # Add some rectangles to simulate components
             cv2.rectangle(image, (200, 200), (400, 350), (60, 60, 60), -1)
@@ -174,15 +409,8 @@ class CameraService:
         """
         Capture image and return as bytes (useful for direct inference).
         """
-        image_path = self.capture()
-        if image_path is None:
-            return None
-        try:
-            with open(image_path, 'rb') as f:
-                return f.read()
-        except Exception as e:
-            logger.error(f"Failed to read captured image: {e}")
-            return None
+        captured = self.capture_jpeg()
+        return captured[0] if captured else None
 
     def cleanup(self, image_path: Path) -> None:
         """Clean up temporary captured image."""
@@ -203,11 +431,18 @@ class CameraService:
             "temp_dir_exists": self.temp_dir.exists(),
         }
 
-        if self.use_camera:
+        status["picamera2"] = settings.use_picamera2 and Picamera2 is not None
+
+        if self.use_camera and status["picamera2"]:
+            status["camera_available"] = self._picam is not None or bool(Picamera2.global_camera_info())
+        elif self.use_camera:
             try:
-                cap = cv2.VideoCapture(self.camera_index)
-                status["camera_available"] = cap.isOpened()
-                cap.release()
+                # Reuse the kept-open camera; opening it here also saves the
+                # next capture from doing so
+                with self._camera_lock:
+                    if self._cap is None:
+                        self._cap = self._open_capture()
+                    status["camera_available"] = self._cap is not None and self._cap.isOpened()
             except Exception:
                 status["camera_available"] = False
 
@@ -3,15 +3,47 @@ Upload Service for Server 1 (Raspberry Pi 3)
 Handles uploading captured images to Server 2 (Raspberry Pi 5)
 Includes retry logic with exponential backoff
 """
+import hashlib
+import io
+import random
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
-from typing import Optional, Dict, Any
-from config.settings import settings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Optional, Dict, Any, List, Callable, Tuple, BinaryIO
+from config.settings import get_settings
+
+try:
+    # Streams multipart bodies from the file instead of building them in memory
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 from utils.logger import setup_logger
 
+settings = get_settings()
 logger = setup_logger(__name__, level=settings.log_level)
 
+# MIME types for uploaded images, by lowercase file extension
+MIME_BY_EXT = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.bmp': 'image/bmp',
+}
+
+
+# Lets Server 2 recognise an image it already stores without copying or
+# hashing the upload again
+CONTENT_SHA256_HEADER = 'X-Content-SHA256'
+
+
+def mime_for(path: Path) -> str:
+    """MIME type for an image file, based on its extension"""
+    return MIME_BY_EXT.get(path.suffix.lower(), 'application/octet-stream')
+
 
 class UploadService:
     """
@@ -21,13 +53,45 @@ class UploadService:
 
     def __init__(self):
         self.upload_url = settings.server2_upload_url
+        self.batch_upload_url = settings.server2_upload_batch_url
         self.timeout = settings.upload_timeout
         self.max_retries = settings.upload_retries
         self.retry_delay = settings.upload_retry_delay
+        self.retry_delay_cap = settings.upload_retry_delay_cap
+
+        # Uploads that exhausted all retries in a row; widens the backoff
+        # window while Server 2 stays unreachable
+        self._consecutive_failures = 0
+
+        # Circuit breaker: after upload_breaker_threshold failed uploads in a
+        # row, fail fast for upload_breaker_reset_s, then let a single
+        # attempt through to probe Server 2. Uploads run on several
+        # threadpool threads, so the counters are read and updated under a lock
+        self._last_failure_at = 0.0
+        self._breaker_lock = threading.Lock()
+
+        # Single uploads: short connect timeout so a dead peer is detected
+        # fast; the response wait keeps upload_timeout because Server 2
+        # answers only after creating the Label Studio task
+        self.connect_timeout = min(settings.upload_connect_timeout, float(self.timeout))
+
+        # Persistent session: keep-alive connection reused across uploads
+        # and health checks instead of a new TCP handshake per request
+        # Pool sized for the threadpool'd routes (capture, status, test-upload
+        # can overlap); retries are handled by _upload_with_retries
+        self.pool_size = 4
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Server 2 health probe: URL built once, last result cached briefly
+        self.health_url = f"{settings.server2_url}/api/v1/health"
+        self._health_cache: Optional[Tuple[float, bool]] = None  # (monotonic timestamp, reachable)
 
         logger.info(
-            f"UploadService initialized: url={self.upload_url}, "
-            f"retries={self.max_retries}, timeout={self.timeout}s"
+            "UploadService initialized: url=%s, retries=%s, timeout=%ss",
+            self.upload_url, self.max_retries, self.timeout
         )
 
     def upload_image(self, image_path: Path) -> Dict[str, Any]:
@@ -51,46 +115,223 @@ class UploadService:
         file_size_kb = image_path.stat().st_size / 1024
 
         logger.info(
-            f"Starting upload: {image_path.name} ({file_size_kb:.1f} KB) "
-            f"to {self.upload_url}"
+            "Starting upload: %s (%.1f KB) to %s",
+            image_path.name, file_size_kb, self.upload_url
+        )
+
+        return self._upload_with_retries(
+            lambda attempt: self._attempt_upload(image_path, attempt)
+        )
+
+    def upload_bytes(self, data: bytes, filename: str) -> Dict[str, Any]:
+        """
+        Upload an in-memory image to Server 2 with retry logic.
+
+        The capture flows use this so a JPEG never touches the SD card on
+        the success path. If every attempt fails, the image is written to
+        the temp dir so it is not lost.
+
+        Args:
+            data: Encoded image bytes
+            filename: Filename sent to Server 2
+
+        Returns:
+            Response dictionary from Server 2
+
+        Raises:
+            RuntimeError: If upload fails after all retries
+        """
+        logger.info(
+            "Starting upload: %s (%.1f KB) to %s",
+            filename, len(data) / 1024, self.upload_url
         )
+        mime_type = mime_for(Path(filename))
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        try:
+            return self._upload_with_retries(
+                lambda attempt: self._post_file(
+                    filename, io.BytesIO(data), mime_type, attempt, sha256=sha256
+                )
+            )
+        except RuntimeError:
+            spool_path = settings.temp_dir / filename
+            try:
+                spool_path.write_bytes(data)
+                logger.warning("Upload failed, image kept at %s", spool_path)
+            except OSError as e:
+                logger.error("Failed to keep %s after upload failure: %s", filename, e)
+            raise
+
+    def upload_images_batch(self, image_paths: List[Path]) -> List[Dict[str, Any]]:
+        """
+        Upload several images to Server 2 using batch requests.
+
+        Images are sent in chunks of upload_batch_size per multipart POST,
+        so a burst of N captures costs ceil(N / batch_size) requests.
+
+        Args:
+            image_paths: Paths to image files to upload
+
+        Returns:
+            Response dictionaries from Server 2, one per image, in order
+
+        Raises:
+            RuntimeError: If a batch fails after all retries
+            FileNotFoundError: If an image file doesn't exist
+        """
+        missing = [p for p in image_paths if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"Images not found: {missing}")
+
+        batch_size = max(1, settings.upload_batch_size)
+        results: List[Dict[str, Any]] = []
+
+        for start in range(0, len(image_paths), batch_size):
+            batch = image_paths[start:start + batch_size]
+            logger.info(
+                "Starting batch upload: %s images to %s", len(batch), self.batch_upload_url
+            )
+            results.extend(self._upload_with_retries(
+                lambda attempt, batch=batch: self._attempt_batch_upload(batch, attempt)
+            ))
+
+        return results
+
+    def _upload_with_retries(self, attempt_upload: Callable[[int], Any]) -> Any:
+        """
+        Run an upload attempt with retry logic and capped, jittered
+        exponential backoff.
+
+        Client errors (4xx other than 429) and read timeouts are not
+        retried. While the circuit is open the upload fails immediately;
+        once it may be probed again only one attempt is made.
+
+        Args:
+            attempt_upload: Callable performing one attempt, given the attempt number
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            RuntimeError: If upload fails after all retries
+        """
+        max_retries = self.max_retries
+        with self._breaker_lock:
+            failures = self._consecutive_failures
+            if failures >= settings.upload_breaker_threshold:
+                now = time.monotonic()
+                if now - self._last_failure_at < settings.upload_breaker_reset_s:
+                    raise RuntimeError(
+                        f"Server 2 unavailable after {failures} failed uploads, "
+                        f"not retrying for up to {settings.upload_breaker_reset_s:.0f}s"
+                    )
+                # This upload is the probe; concurrent uploads keep failing
+                # fast until it settles
+                self._last_failure_at = now
+                max_retries = 1
 
-        # Retry loop with exponential backoff
         last_exception = None
-        for attempt in range(1, self.max_retries + 1):
+        for attempt in range(1, max_retries + 1):
             try:
-                response_data = self._attempt_upload(image_path, attempt)
-                logger.info(
-                    f"Upload successful on attempt {attempt}: "
-                    f"{response_data.get('status', 'unknown')}"
-                )
+                response_data = attempt_upload(attempt)
+                logger.info("Upload successful on attempt %s", attempt)
+                with self._breaker_lock:
+                    self._consecutive_failures = 0
                 return response_data
 
             except requests.exceptions.RequestException as e:
+                if isinstance(e, requests.exceptions.ReadTimeout):
+                    logger.error("No response from Server 2, not re-sending: %s", e)
+                    raise RuntimeError(f"Upload outcome unknown: {e}") from e
+                if not self._is_retryable(e):
+                    logger.error("Upload rejected by Server 2: %s", e)
+                    raise RuntimeError(f"Upload rejected: {e}") from e
+
                 last_exception = e
                 logger.warning(
-                    f"Upload attempt {attempt}/{self.max_retries} failed: {e}"
+                    "Upload attempt %s/%s failed: %s", attempt, max_retries, e
                 )
 
                 # Don't sleep after last attempt
-                if attempt < self.max_retries:
-                    delay = self.retry_delay * (2 ** (attempt - 1))  # Exponential backoff
-                    logger.info(f"Retrying in {delay:.1f}s...")
+                if attempt < max_retries:
+                    delay = self._backoff_delay(attempt, failures)
+                    logger.info("Retrying in %.1fs...", delay)
                     time.sleep(delay)
 
             except Exception as e:
                 # Non-network errors shouldn't be retried
-                logger.error(f"Upload failed with non-recoverable error: {e}", exc_info=True)
+                logger.error("Upload failed with non-recoverable error: %s", e, exc_info=True)
                 raise RuntimeError(f"Upload failed: {e}") from e
 
         # All retries exhausted
+        with self._breaker_lock:
+            self._consecutive_failures += 1
+            self._last_failure_at = time.monotonic()
         error_msg = (
-            f"Upload failed after {self.max_retries} attempts. "
+            f"Upload failed after {max_retries} attempts. "
             f"Last error: {last_exception}"
         )
         logger.error(error_msg)
         raise RuntimeError(error_msg) from last_exception
 
+    def breaker_state(self) -> Dict[str, Any]:
+        """
+        Circuit breaker state for health reporting.
+
+        Returns:
+            Dictionary with state ("closed", "open" or "half_open", i.e.
+            the next upload probes Server 2), consecutive failed uploads and
+            seconds until the next probe is let through
+        """
+        with self._breaker_lock:
+            failures = self._consecutive_failures
+            last_failure_at = self._last_failure_at
+
+        state = "closed"
+        probe_in_s = 0.0
+        if failures >= settings.upload_breaker_threshold:
+            probe_in_s = max(
+                0.0, settings.upload_breaker_reset_s - (time.monotonic() - last_failure_at)
+            )
+            state = "open" if probe_in_s > 0 else "half_open"
+
+        return {
+            "state": state,
+            "consecutive_failures": failures,
+            "probe_in_s": round(probe_in_s, 1)
+        }
+
+    def _backoff_delay(self, attempt: int, failures: int) -> float:
+        """
+        Delay before the next retry.
+
+        Exponential in the attempt number, scaled up while previous uploads
+        (failures, counted when this upload started) kept failing and capped
+        at upload_retry_delay_cap. Full jitter (uniform between 0 and that
+        bound) so several clients do not retry in lockstep.
+        """
+        widen = 2 ** min(failures, 3)
+        delay = min(self.retry_delay_cap, self.retry_delay * widen * (2 ** (attempt - 1)))
+        return random.uniform(0, delay)
+
+    @staticmethod
+    def _is_retryable(error: requests.exceptions.RequestException) -> bool:
+        """
+        Whether a failed request is worth retrying.
+
+        Connect timeouts, connection errors, 429 and 5xx are retried; other
+        HTTP errors mean the request itself was rejected. Read timeouts are
+        not retried: Server 2 may already have stored the image and created
+        its Label Studio task, and a re-sent POST would create a second one.
+        """
+        if isinstance(error, requests.exceptions.ReadTimeout):
+            return False
+        response = getattr(error, 'response', None)
+        if isinstance(error, requests.exceptions.HTTPError) and response is not None:
+            return response.status_code == 429 or response.status_code >= 500
+        return True
+
     def _attempt_upload(self, image_path: Path, attempt: int) -> Dict[str, Any]:
         """
         Single upload attempt.
@@ -106,29 +347,118 @@ class UploadService:
             requests.exceptions.RequestException: On network/HTTP errors
         """
         with open(image_path, 'rb') as f:
-            # Prepare multipart form data
-            files = {
-                'file': (
-                    image_path.name,
-                    f,
-                    'image/jpeg'  # Assuming JPEG; adjust if needed
-                )
-            }
+            return self._post_file(image_path.name, f, mime_for(image_path), attempt)
+
+    def _post_file(
+        self,
+        filename: str,
+        fileobj: BinaryIO,
+        mime_type: str,
+        attempt: int,
+        sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        POST one file to Server 2 as the multipart "file" field.
+
+        Args:
+            filename: Filename sent to Server 2
+            fileobj: Open binary file (or in-memory buffer) to send
+            mime_type: Content type of the file part
+            attempt: Current attempt number (for logging)
+            sha256: SHA256 of the file if already known, sent as
+                X-Content-SHA256
+
+        Returns:
+            Response dictionary from Server 2
 
-            # Send POST request
-            logger.debug(f"Attempt {attempt}: Sending POST to {self.upload_url}")
-            response = requests.post(
+        Raises:
+            requests.exceptions.RequestException: On network/HTTP errors
+        """
+        # Prepare multipart form data
+        files = {
+            'file': (
+                filename,
+                fileobj,
+                mime_type
+            )
+        }
+
+        headers = {CONTENT_SHA256_HEADER: sha256} if sha256 else {}
+
+        # Send POST request
+        timeout = (self.connect_timeout, float(self.timeout))
+        logger.debug(
+            "Attempt %s: Sending POST to %s (connect timeout %.1fs, read timeout %.1fs)",
+            attempt, self.upload_url, *timeout
+        )
+        if MultipartEncoder is not None:
+            encoder = MultipartEncoder(fields=files)
+            response = self.session.post(
+                self.upload_url,
+                data=encoder,
+                headers={**headers, 'Content-Type': encoder.content_type},
+                timeout=timeout
+            )
+        else:
+            response = self.session.post(
                 self.upload_url,
                 files=files,
-                timeout=self.timeout
+                headers=headers,
+                timeout=timeout
             )
 
-            # Check for HTTP errors
+        # Check for HTTP errors
+        response.raise_for_status()
+
+        # Parse response
+        response_data = response.json()
+        logger.debug("Response: %s", response_data)
+
+        return response_data
+
+    def _attempt_batch_upload(self, image_paths: List[Path], attempt: int) -> List[Dict[str, Any]]:
+        """
+        Single batch upload attempt.
+
+        Args:
+            image_paths: Paths to image files in this batch
+            attempt: Current attempt number (for logging)
+
+        Returns:
+            Response dictionaries from Server 2, one per image
+
+        Raises:
+            requests.exceptions.RequestException: On network/HTTP errors
+        """
+        with ExitStack() as stack:
+            # Repeated "files" fields in one multipart body
+            files = [
+                ('files', (path.name, stack.enter_context(open(path, 'rb')), mime_for(path)))
+                for path in image_paths
+            ]
+
+            logger.debug("Attempt %s: Sending batch POST to %s", attempt, self.batch_upload_url)
+            if MultipartEncoder is not None:
+                # Streams the files one after another instead of holding the
+                # whole batch body in memory
+                encoder = MultipartEncoder(fields=files)
+                response = self.session.post(
+                    self.batch_upload_url,
+                    data=encoder,
+                    headers={'Content-Type': encoder.content_type},
+                    timeout=self.timeout
+                )
+            else:
+                response = self.session.post(
+                    self.batch_upload_url,
+                    files=files,
+                    timeout=self.timeout
+                )
+
             response.raise_for_status()
 
-            # Parse response
             response_data = response.json()
-            logger.debug(f"Response: {response_data}")
+            logger.debug("Response: %s", response_data)
 
             return response_data
 
@@ -156,7 +486,7 @@ class UploadService:
             return response
 
         except Exception as e:
-            logger.error(f"Upload and cleanup failed: {e}")
+            logger.error("Upload and cleanup failed: %s", e)
             raise
 
     def _cleanup_image(self, image_path: Path) -> None:
@@ -169,29 +499,71 @@ class UploadService:
         try:
             if image_path.exists():
                 image_path.unlink()
-                logger.debug(f"Cleaned up local image: {image_path}")
+                logger.debug("Cleaned up local image: %s", image_path)
         except Exception as e:
-            logger.warning(f"Failed to cleanup {image_path}: {e}")
+            logger.warning("Failed to cleanup %s: %s", image_path, e)
 
-    def test_connection(self) -> bool:
+    def test_connection(self, refresh: bool = False) -> bool:
         """
         Test connection to Server 2.
 
+        The result is reused for server2_health_ttl_s seconds unless
+        refresh is set.
+
+        Args:
+            refresh: Probe Server 2 even if a cached result is available
+
         Returns:
             True if Server 2 is reachable, False otherwise
         """
+        if (
+            not refresh
+            and self._health_cache is not None
+            and time.monotonic() - self._health_cache[0] < settings.server2_health_ttl_s
+        ):
+            return self._health_cache[1]
+
         try:
             # Try to reach Server 2's health endpoint
-            health_url = f"{settings.server2_url}/api/v1/health"
-            response = requests.get(health_url, timeout=5)
+            response = self.session.get(self.health_url, timeout=5)
             response.raise_for_status()
 
-            logger.info(f"Connection test successful: {health_url}")
-            return True
+            logger.info("Connection test successful: %s", self.health_url)
+            reachable = True
 
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Connection test failed: {e}")
-            return False
+            logger.warning("Connection test failed: %s", e)
+            reachable = False
+
+        self._health_cache = (time.monotonic(), reachable)
+        return reachable
+
+    def warm_up(self) -> None:
+        """
+        Open pooled keep-alive connections to Server 2 ahead of the first
+        uploads.
+
+        Probes once and gives up if Server 2 is down; otherwise issues
+        concurrent health requests so the pool holds pool_size connections.
+        """
+        if not self.test_connection(refresh=True):
+            return
+
+        def probe(_):
+            try:
+                self.session.get(self.health_url, timeout=2)
+            except requests.exceptions.RequestException:
+                pass
+
+        # The first connection is already pooled by test_connection
+        with ThreadPoolExecutor(max_workers=self.pool_size - 1) as executor:
+            list(executor.map(probe, range(self.pool_size - 1)))
+
+        logger.debug("Connection pool to Server 2 warmed up (%s connections)", self.pool_size)
+
+    def close(self) -> None:
+        """Close pooled connections to Server 2."""
+        self.session.close()
 
 
 # Global upload service instance
@@ -6,6 +6,17 @@ import logging
 import sys
 from typing import Optional
 
+# Format: timestamp - name - level - message
+_FORMATTER = logging.Formatter(
+    fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Console handler (stdout for Docker logs), shared by every module logger so
+# there is one handler and one stream lock however many modules log
+_CONSOLE_HANDLER = logging.StreamHandler(sys.stdout)
+_CONSOLE_HANDLER.setFormatter(_FORMATTER)
+
 
 def setup_logger(
     name: str,
@@ -30,21 +41,12 @@ def setup_logger(
     if logger.handlers:
         return logger
 
-    # Format: timestamp - name - level - message
-    formatter = logging.Formatter(
-        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-    # Console handler (stdout for Docker logs)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    logger.addHandler(_CONSOLE_HANDLER)
 
     # Optional file handler
     if log_file:
         file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(_FORMATTER)
         logger.addHandler(file_handler)
 
     return logger
@@ -2,11 +2,19 @@
 API Routes for Server 2 (Label Studio Service - Raspberry Pi 5)
 Provides endpoints for image storage, Label Studio integration, and data management
 """
-import shutil
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+import orjson
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse, Response
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, BinaryIO
 from models.schemas import (
     UploadResponse,
     ImageInfo,
@@ -22,11 +30,45 @@ from utils.logger import setup_logger
 
 logger = setup_logger(__name__, level=settings.log_level)
 
-router = APIRouter(prefix="/api/v1", tags=["storage"])
+# Media types for served images, by lowercase file extension
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".bmp": "image/bmp",
+}
+
+# Staging directory for uploads, on the same filesystem as the store so the
+# final move is a rename; created once at import
+_TEMP_DIR = settings.data_root / "__temp__"
+_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+
+# Last /health storage check: (monotonic timestamp, result)
+_storage_health: Optional[Tuple[float, bool]] = None
+
+# Liveness body, fixed for the life of the process
+_LIVE_BODY = orjson.dumps({"status": "alive", "service": settings.service_name})
+
+# SHA256 announced by Server 1 in X-Content-SHA256 (lowercase hex); anything
+# else is ignored and the upload is hashed as usual
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+# Bulkhead for the storage path: bounds concurrent temp files, hashing and
+# disk writes so a burst of uploads cannot exhaust the Pi
+_UPLOAD_SLOTS = asyncio.Semaphore(settings.max_concurrent_uploads)
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["storage"],
+    default_response_class=ORJSONResponse
+)
 
 
 @router.post("/upload", response_model=UploadResponse)
-async def upload_image(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def upload_image(
+    file: UploadFile = File(...),
+    content_sha256: Optional[str] = Header(None, alias="X-Content-SHA256")
+) -> Dict[str, Any]:
     """
     Upload image from Server 1 (Camera).
 
@@ -37,6 +79,9 @@ async def upload_image(file: UploadFile = File(...)) -> Dict[str, Any]:
 
     Args:
         file: Uploaded image file
+        content_sha256: SHA256 of the file computed by the sender; when an
+            image is stored under it and the body hashes to the same value,
+            the temp file and copy are skipped
 
     Returns:
         UploadResponse with storage and task information
@@ -44,69 +89,224 @@ async def upload_image(file: UploadFile = File(...)) -> Dict[str, Any]:
     Raises:
         HTTPException: If upload or processing fails
     """
-    logger.info(f"Received upload: {file.filename} ({file.content_type})")
+    storage_result = await _find_announced_upload(file, content_sha256)
+    if storage_result is None:
+        storage_result = await _store_upload(file)
+    return await _create_task_for_upload(storage_result)
+
+
+@router.post("/upload/batch", response_model=List[UploadResponse])
+async def upload_images_batch(files: List[UploadFile] = File(...)) -> List[Dict[str, Any]]:
+    """
+    Upload several images from Server 1 in one request.
+
+    Each file is stored like a single upload, several at a time. Label
+    Studio tasks for the newly stored images are then created with one
+    import call; duplicates get no new task.
+
+    Args:
+        files: Uploaded image files (multipart field "files")
+
+    Returns:
+        List of UploadResponse, in the order the files were sent
+
+    Raises:
+        HTTPException: If any file fails validation or storage
+    """
+    logger.info("Received batch upload: %s files", len(files))
+
+    # Files are copied and hashed a slot-sized group at a time (hashlib
+    # releases the GIL); groups keep waits for a slot within
+    # upload_slot_timeout_s, and results keep the order files were sent in
+    storage_results: List[Dict[str, Any]] = []
+    group_size = max(1, settings.max_concurrent_uploads)
+    for start in range(0, len(files), group_size):
+        group = files[start:start + group_size]
+        storage_results.extend(await asyncio.gather(*(_store_upload(file) for file in group)))
+
+    # Content already stored (e.g. a retried batch) gets no new task, and a
+    # file sent twice in one batch is imported once, at its first position
+    new_indices: List[int] = []
+    seen_sha256 = set()
+    for index, result in enumerate(storage_results):
+        if result["status"] != "already_stored" and result["sha256"] not in seen_sha256:
+            seen_sha256.add(result["sha256"])
+            new_indices.append(index)
+
+    # One Label Studio import for the whole batch
+    task_results: Dict[int, Optional[Dict[str, Any]]] = {}
+    if labelstudio_service.project and new_indices:
+        try:
+            created = await labelstudio_service.create_tasks_from_images([
+                (Path(storage_results[i]["path"]), storage_results[i]["sha256"])
+                for i in new_indices
+            ])
+            task_results = dict(zip(new_indices, created))
+            logger.info("Label Studio tasks created: %s", len(created))
+
+        except Exception as e:
+            logger.error("Failed to create Label Studio tasks: %s", e, exc_info=True)
+            # Don't fail the upload if task creation fails
+            task_results = {i: {"error": str(e)} for i in new_indices}
+
+    new = set(new_indices)
+    return [
+        _upload_response(storage_result, task_results.get(index))
+        if index in new else _duplicate_response(storage_result)
+        for index, storage_result in enumerate(storage_results)
+    ]
+
+
+@asynccontextmanager
+async def _upload_slot():
+    """
+    Hold one of the max_concurrent_uploads storage slots.
+
+    Raises:
+        HTTPException: 503 if no slot frees up within upload_slot_timeout_s
+            (Server 1 retries 503s with backoff)
+    """
+    try:
+        await asyncio.wait_for(_UPLOAD_SLOTS.acquire(), timeout=settings.upload_slot_timeout_s)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many concurrent uploads, retry later")
+    try:
+        yield
+    finally:
+        _UPLOAD_SLOTS.release()
+
+
+async def _find_announced_upload(
+    file: UploadFile,
+    sha256_hint: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Storage result for an upload whose announced SHA256 is already stored.
+
+    The hint only picks the candidate: the body must have the stored file's
+    size and hash to the announced value, so a wrong header can never drop
+    a new image. A match skips the temp file and the copy.
+
+    Args:
+        file: Uploaded image file
+        sha256_hint: SHA256 announced by the sender (X-Content-SHA256), if any
+
+    Returns:
+        Storage result with status "already_stored", or None if the hint is
+        missing, malformed, not stored or does not match the body
+    """
+    if not (file.filename and sha256_hint and _SHA256_HEX.fullmatch(sha256_hint)):
+        return None
+    existing = await run_in_threadpool(
+        storage_service.find_unlabeled_image, sha256_hint, file.filename
+    )
+    if existing is None:
+        return None
+
+    async with _upload_slot():
+        matches = await run_in_threadpool(
+            _body_matches, file.file, existing["size_bytes"], sha256_hint
+        )
+    if not matches:
+        logger.warning("X-Content-SHA256 does not match upload body: %s", file.filename)
+        return None
+    return existing
+
+
+def _body_matches(source: BinaryIO, size_bytes: int, sha256: str) -> bool:
+    """
+    Whether source is size_bytes long and hashes to sha256.
+
+    Rewinds source afterwards so it can still be stored normally.
+    """
+    try:
+        if source.seek(0, os.SEEK_END) != size_bytes:
+            return False
+        source.seek(0)
+
+        sha256_hash = hashlib.sha256()
+        chunk_buffer = bytearray(settings.upload_buffer_size)
+        chunk_view = memoryview(chunk_buffer)
+        while n := source.readinto(chunk_buffer):
+            sha256_hash.update(chunk_view[:n])
+        return sha256_hash.hexdigest() == sha256
+    finally:
+        source.seek(0)
+
+
+async def _store_upload(file: UploadFile) -> Dict[str, Any]:
+    """
+    Store one uploaded file in the unlabeled directory, holding an upload
+    slot while doing so.
+
+    Args:
+        file: Uploaded image file
+
+    Returns:
+        Storage result from the storage service
+
+    Raises:
+        HTTPException: If validation or storage fails, or no slot is free
+    """
+    async with _upload_slot():
+        return await _store_upload_file(file)
+
+
+async def _store_upload_file(file: UploadFile) -> Dict[str, Any]:
+    """
+    Store one uploaded file in the unlabeled directory.
+
+    Args:
+        file: Uploaded image file
+
+    Returns:
+        Storage result from the storage service
+
+    Raises:
+        HTTPException: If validation or storage fails
+    """
+    logger.info("Received upload: %s (%s)", file.filename, file.content_type)
 
     # Validate file
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided")
 
-    # Create temporary file
-    temp_dir = settings.data_root / "__temp__"
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    temp_path = temp_dir / file.filename
+    # Create temporary file (unique name, so concurrent uploads of the same
+    # filename cannot overwrite each other)
+    fd, temp_name = tempfile.mkstemp(dir=_TEMP_DIR, suffix=Path(file.filename).suffix)
+    os.close(fd)
+    temp_path = Path(temp_name)
 
     try:
-        # Save uploaded file temporarily
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Save uploaded file temporarily, hashing it in the same pass
+        _, sha256 = await _save_upload_stream(file, temp_path)
 
-        logger.info(f"Saved temporary file: {temp_path}")
+        logger.info("Saved temporary file: %s", temp_path)
 
         # Store in unlabeled directory
-        storage_result = storage_service.store_unlabeled_image(
+        storage_result = await run_in_threadpool(
+            storage_service.store_unlabeled_image,
             source_path=temp_path,
-            filename=file.filename
+            filename=file.filename,
+            sha256=sha256
         )
 
-        sha256 = storage_result["sha256"]
-        stored_path = Path(storage_result["path"])
-
-        logger.info(f"Image stored: {stored_path}")
+        logger.info("Image stored: %s", storage_result['path'])
+        return storage_result
 
-        # Create Label Studio task
-        task_result = None
-        if labelstudio_service.project:
-            try:
-                task_result = labelstudio_service.create_task_from_image(
-                    image_path=stored_path,
-                    sha256=sha256
-                )
-                logger.info(f"Label Studio task created: ID={task_result['task_id']}")
-
-            except Exception as e:
-                logger.error(f"Failed to create Label Studio task: {e}", exc_info=True)
-                # Don't fail the upload if task creation fails
-                task_result = {"error": str(e)}
-
-        # Prepare response
-        response = {
-            **storage_result,
-            "task_id": task_result.get("task_id") if task_result else None,
-            "message": "Image uploaded and task created successfully" if task_result else "Image uploaded (task creation failed)"
-        }
-
-        return response
+    except HTTPException:
+        raise
 
     except ValueError as e:
-        logger.error(f"Validation error: {e}")
+        logger.error("Validation error: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
     except IOError as e:
-        logger.error(f"Storage error: {e}")
+        logger.error("Storage error: %s", e)
         raise HTTPException(status_code=500, detail=f"Storage failed: {str(e)}")
 
     except Exception as e:
-        logger.error(f"Upload failed: {e}", exc_info=True)
+        logger.error("Upload failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
     finally:
@@ -115,7 +315,129 @@ async def upload_image(file: UploadFile = File(...)) -> Dict[str, Any]:
             try:
                 temp_path.unlink()
             except Exception as e:
-                logger.warning(f"Failed to cleanup temp file: {e}")
+                logger.warning("Failed to cleanup temp file: %s", e)
+
+
+async def _save_upload_stream(file: UploadFile, dest_path: Path) -> Tuple[int, str]:
+    """
+    Stream an uploaded file to disk with a fixed-size buffer.
+
+    The whole copy runs in the threadpool, so neither the reads from the
+    spooled upload nor the disk writes block the event loop, and it costs
+    one thread hand-off per upload instead of one per chunk. The SHA256 is
+    computed from the same chunks as they are written, so the file is not
+    read back from disk for content addressing. Oversized uploads are
+    rejected as soon as the limit is crossed.
+
+    Args:
+        file: Uploaded image file
+        dest_path: Temporary file to write
+
+    Returns:
+        Tuple of (bytes written, hexadecimal SHA256 hash)
+
+    Raises:
+        HTTPException: 413 if the upload exceeds max_upload_size_mb
+    """
+    return await run_in_threadpool(_copy_and_hash, file.file, dest_path)
+
+
+def _copy_and_hash(source: BinaryIO, dest_path: Path) -> Tuple[int, str]:
+    """
+    Blocking part of _save_upload_stream: copy source to dest_path while
+    hashing it.
+    """
+    max_bytes = settings.max_upload_size_mb * 1024 * 1024
+    total = 0
+    sha256_hash = hashlib.sha256()
+
+    # One buffer reused for every chunk instead of a new bytes object per read
+    chunk_buffer = bytearray(settings.upload_buffer_size)
+    chunk_view = memoryview(chunk_buffer)
+
+    with open(dest_path, "wb") as buffer:
+        while n := source.readinto(chunk_buffer):
+            total += n
+            if total > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File exceeds maximum upload size of {settings.max_upload_size_mb} MB"
+                )
+            chunk = chunk_view[:n]
+            sha256_hash.update(chunk)
+            buffer.write(chunk)
+
+    return total, sha256_hash.hexdigest()
+
+
+async def _create_task_for_upload(storage_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create the Label Studio task for a stored upload and build the response.
+
+    A failed task creation does not fail the upload. Content that was
+    already stored gets no new task (the first upload created it), whether
+    or not the sender announced its hash.
+
+    Args:
+        storage_result: Result of _store_upload or _find_announced_upload
+
+    Returns:
+        Upload response dictionary
+    """
+    if storage_result["status"] == "already_stored":
+        return _duplicate_response(storage_result)
+
+    task_result = None
+    if labelstudio_service.project:
+        try:
+            task_result = await labelstudio_service.create_task_from_image(
+                image_path=Path(storage_result["path"]),
+                sha256=storage_result["sha256"]
+            )
+            logger.info("Label Studio task created: ID=%s", task_result['task_id'])
+
+        except Exception as e:
+            logger.error("Failed to create Label Studio task: %s", e, exc_info=True)
+            # Don't fail the upload if task creation fails
+            task_result = {"error": str(e)}
+
+    return _upload_response(storage_result, task_result)
+
+
+def _duplicate_response(storage_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Upload response for content that was already stored.
+    """
+    return {
+        **storage_result,
+        "task_id": None,
+        "message": "Image already stored, no new Label Studio task created"
+    }
+
+
+def _upload_response(
+    storage_result: Dict[str, Any],
+    task_result: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Combine storage and task creation results into an upload response.
+
+    Only a result carrying a task ID counts as success; a failed creation
+    ({"error": ...}) reports its error instead.
+    """
+    task_id = task_result.get("task_id") if task_result else None
+    if task_id is not None:
+        message = "Image uploaded and task created successfully"
+    elif task_result and task_result.get("error"):
+        message = f"Image uploaded (task creation failed: {task_result['error']})"
+    else:
+        message = "Image uploaded (task creation failed)"
+
+    return {
+        **storage_result,
+        "task_id": task_id,
+        "message": message
+    }
 
 
 @router.get("/images/unlabeled", response_model=List[ImageInfo])
@@ -133,14 +455,17 @@ async def list_unlabeled_images(
     Returns:
         List of unlabeled image information
     """
-    logger.debug(f"Listing unlabeled images: limit={limit}, offset={offset}")
+    logger.debug("Listing unlabeled images: limit=%s, offset=%s", limit, offset)
 
     try:
-        images = storage_service.list_unlabeled_images(limit=limit, offset=offset)
-        return images
+        images = await run_in_threadpool(
+            storage_service.list_unlabeled_images, limit=limit, offset=offset
+        )
+        # Plain dicts from the storage service, serialized without re-validation
+        return ORJSONResponse(content=images)
 
     except Exception as e:
-        logger.error(f"Failed to list unlabeled images: {e}", exc_info=True)
+        logger.error("Failed to list unlabeled images: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to list images: {str(e)}"
@@ -162,14 +487,16 @@ async def list_labeled_images(
     Returns:
         List of labeled image information
     """
-    logger.debug(f"Listing labeled images: limit={limit}, offset={offset}")
+    logger.debug("Listing labeled images: limit=%s, offset=%s", limit, offset)
 
     try:
-        images = storage_service.list_labeled_images(limit=limit, offset=offset)
-        return images
+        images = await run_in_threadpool(
+            storage_service.list_labeled_images, limit=limit, offset=offset
+        )
+        return ORJSONResponse(content=images)
 
     except Exception as e:
-        logger.error(f"Failed to list labeled images: {e}", exc_info=True)
+        logger.error("Failed to list labeled images: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to list images: {str(e)}"
@@ -187,11 +514,11 @@ async def get_storage_stats() -> Dict[str, Any]:
     logger.debug("Getting storage statistics")
 
     try:
-        stats = storage_service.get_statistics()
-        return stats
+        stats = await run_in_threadpool(storage_service.get_statistics)
+        return ORJSONResponse(content=stats)
 
     except Exception as e:
-        logger.error(f"Failed to get statistics: {e}", exc_info=True)
+        logger.error("Failed to get statistics: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get statistics: {str(e)}"
@@ -215,14 +542,14 @@ async def get_labelstudio_stats() -> Dict[str, Any]:
                 detail="Label Studio not initialized"
             )
 
-        stats = labelstudio_service.get_project_stats()
+        stats = await run_in_threadpool(labelstudio_service.get_project_stats)
         return stats
 
     except HTTPException:
         raise
 
     except Exception as e:
-        logger.error(f"Failed to get Label Studio stats: {e}", exc_info=True)
+        logger.error("Failed to get Label Studio stats: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get stats: {str(e)}"
@@ -241,11 +568,11 @@ async def get_status() -> Dict[str, Any]:
 
     try:
         # Get storage stats
-        storage_stats = storage_service.get_statistics()
+        storage_stats = await run_in_threadpool(storage_service.get_statistics)
 
         # Get Label Studio stats
-        ls_stats = labelstudio_service.get_project_stats()
-        ls_healthy = labelstudio_service.is_healthy()
+        ls_stats = await run_in_threadpool(labelstudio_service.get_project_stats)
+        ls_healthy = await labelstudio_service.is_healthy()
 
         # Determine overall status
         overall_status = "healthy"
@@ -265,7 +592,7 @@ async def get_status() -> Dict[str, Any]:
         }
 
     except Exception as e:
-        logger.error(f"Status check failed: {e}", exc_info=True)
+        logger.error("Status check failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Status check failed: {str(e)}"
@@ -294,13 +621,39 @@ async def serve_image(category: str):
     except ValueError:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    suffix = image_path.suffix.lower()
-    media_types = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".bmp": "image/bmp"}
-    media_type = media_types.get(suffix, "application/octet-stream")
+    media_type = MEDIA_TYPES.get(image_path.suffix.lower(), "application/octet-stream")
 
     return FileResponse(str(image_path), media_type=media_type)
 
 
+def _storage_healthy() -> bool:
+    """
+    Whether the storage directories exist, re-checked at most every
+    storage_health_ttl_s seconds (they are created at startup and probes
+    arrive every few seconds).
+    """
+    global _storage_health
+    now = time.monotonic()
+    if _storage_health is None or now - _storage_health[0] >= settings.storage_health_ttl_s:
+        healthy = settings.unlabeled_dir.exists() and settings.labeled_dir.exists()
+        _storage_health = (now, healthy)
+    return _storage_health[1]
+
+
+@router.get("/live")
+async def liveness() -> Response:
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Answers from a prebuilt body without touching storage or Label Studio,
+    for orchestrators that poll liveness often (e.g. a Kubernetes
+    livenessProbe). It says nothing about storage; the container
+    healthcheck stays on /health, whose storage check is cached for
+    storage_health_ttl_s.
+    """
+    return Response(content=_LIVE_BODY, media_type="application/json")
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check() -> Dict[str, Any]:
     """
@@ -311,8 +664,8 @@ async def health_check() -> Dict[str, Any]:
     """
     try:
         # Check components
-        storage_healthy = settings.unlabeled_dir.exists() and settings.labeled_dir.exists()
-        ls_healthy = labelstudio_service.is_healthy() if labelstudio_service.client else False
+        storage_healthy = _storage_healthy()
+        ls_healthy = await labelstudio_service.is_healthy() if labelstudio_service.client else False
 
         overall_status = "healthy"
         if not storage_healthy:
@@ -331,7 +684,7 @@ async def health_check() -> Dict[str, Any]:
         }
 
     except Exception as e:
-        logger.error(f"Health check failed: {e}", exc_info=True)
+        logger.error("Health check failed: %s", e, exc_info=True)
         return {
             "status": "unhealthy",
             "service": settings.service_name,
@@ -2,10 +2,13 @@
 Webhook handlers for Server 2 (Label Studio Service)
 Handles callbacks from Label Studio when annotations are created/updated
 """
+import orjson
 from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter, ValidationError
 from typing import Dict, Any
 from pathlib import Path
-from models.schemas import WebhookPayload, WebhookResponse
+from models.schemas import WebhookPayload
 from services.storage_service import storage_service
 from services.labelstudio_service import labelstudio_service
 from config.settings import settings
@@ -13,29 +16,85 @@ from utils.logger import setup_logger
 
 logger = setup_logger(__name__, level=settings.log_level)
 
-router = APIRouter(prefix="/api/v1/webhook", tags=["webhooks"])
+# Built once at import; validate_json parses and validates in a single pass
+_PAYLOAD_ADAPTER = TypeAdapter(WebhookPayload)
 
+router = APIRouter(
+    prefix="/api/v1/webhook",
+    tags=["webhooks"],
+    default_response_class=ORJSONResponse
+)
 
-@router.post("/annotation-created", response_model=WebhookResponse)
+
+async def _read_payload(request: Request) -> WebhookPayload:
+    """
+    Decode and validate a Label Studio webhook body in a single pass.
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        Validated webhook payload
+
+    Raises:
+        ValidationError: If the body is not valid JSON or lacks the
+            annotation / task metadata needed to locate the image
+            (turned into a 400 response by the app-level handler)
+    """
+    return _PAYLOAD_ADAPTER.validate_json(await request.body())
+
+
+def _store_labeled_image_task(
+    sha256: str,
+    filename: str,
+    annotation_data: Dict[str, Any]
+) -> None:
+    """
+    Store a labeled image after the webhook response has been sent.
+
+    Runs as a FastAPI background task, so failures can only be logged.
+
+    Args:
+        sha256: SHA256 hash of the original image
+        filename: Original filename
+        annotation_data: Label Studio annotation data
+    """
+    try:
+        result = storage_service.store_labeled_image(
+            sha256=sha256,
+            filename=filename,
+            annotation_data=annotation_data
+        )
+        logger.info(
+            "Labeled image %s: %s, annotation: %s",
+            result["status"], result["image_path"], result["annotation_path"]
+        )
+    except Exception as e:
+        logger.error("Background annotation storage failed for %s: %s", filename, e, exc_info=True)
+
+
+@router.post("/annotation-created", status_code=204, response_class=Response)
 async def handle_annotation_created(
     request: Request,
     background_tasks: BackgroundTasks
-) -> Dict[str, Any]:
+) -> Response:
     """
     Handle ANNOTATION_CREATED webhook from Label Studio.
 
     This endpoint is called by Label Studio when a user completes labeling an image.
     It:
     1. Receives the annotation data
-    2. Copies the image to labeled directory
-    3. Saves the annotation JSON alongside
+    2. Checks that the source image exists
+    3. Schedules copying the image to the labeled directory and saving the
+       annotation JSON alongside, then responds with an empty 204 right away
+       (Label Studio only looks at the status code)
 
     Args:
         request: FastAPI request object
         background_tasks: Background task handler
 
     Returns:
-        WebhookResponse with processing status
+        Empty 204 response
 
     Raises:
         HTTPException: If processing fails
@@ -44,13 +103,11 @@ async def handle_annotation_created(
 
     try:
         # Parse webhook payload
-        payload = await request.json()
-        logger.debug(f"Webhook payload: {payload}")
+        payload = await _read_payload(request)
+        logger.debug("Webhook payload: %s", payload)
 
         # Extract key information
-        action = payload.get("action")
-        annotation = payload.get("annotation", {})
-        task = payload.get("task", {})
+        annotation = payload.annotation
 
         if not annotation:
             raise HTTPException(
@@ -59,75 +116,64 @@ async def handle_annotation_created(
             )
 
         # Get task metadata (contains SHA256 and filename)
-        task_meta = task.get("meta", {})
-        sha256 = task_meta.get("sha256")
-        original_filename = task_meta.get("original_filename")
-
-        if not sha256 or not original_filename:
-            logger.error(f"Missing metadata in task: {task_meta}")
-            raise HTTPException(
-                status_code=400,
-                detail="Missing SHA256 or filename in task metadata"
-            )
+        sha256 = payload.task.meta.sha256
+        original_filename = payload.task.meta.original_filename
 
         logger.info(
-            f"Processing annotation for: {original_filename} (SHA256: {sha256[:8]}...)"
+            "Processing annotation for: %s (SHA256: %s...)", original_filename, sha256[:8]
         )
 
-        # Store labeled image and annotation
-        result = storage_service.store_labeled_image(
+        # Fail fast if the image is unknown, the copy itself runs in the background
+        source_path = settings.get_unlabeled_path(sha256, original_filename)
+        if not source_path.exists():
+            raise FileNotFoundError(f"Source image not found: {source_path}")
+
+        # Store labeled image and annotation after responding
+        background_tasks.add_task(
+            _store_labeled_image_task,
             sha256=sha256,
             filename=original_filename,
             annotation_data=annotation
         )
 
-        logger.info(
-            f"Labeled image stored: {result['image_path']}, "
-            f"annotation: {result['annotation_path']}"
-        )
-
-        return {
-            "status": "success",
-            "message": f"Annotation processed for {original_filename}",
-            "labeled_image_path": result["image_path"],
-            "annotation_path": result["annotation_path"]
-        }
+        return Response(status_code=204)
 
-    except HTTPException:
+    except (HTTPException, ValidationError):
         raise
 
     except FileNotFoundError as e:
-        logger.error(f"Source image not found: {e}")
+        logger.error("Source image not found: %s", e)
         raise HTTPException(
             status_code=404,
             detail=f"Source image not found: {str(e)}"
         )
 
     except Exception as e:
-        logger.error(f"Webhook processing failed: {e}", exc_info=True)
+        logger.error("Webhook processing failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process annotation: {str(e)}"
         )
 
 
-@router.post("/annotation-updated", response_model=WebhookResponse)
+@router.post("/annotation-updated", status_code=204, response_class=Response)
 async def handle_annotation_updated(
     request: Request,
     background_tasks: BackgroundTasks
-) -> Dict[str, Any]:
+) -> Response:
     """
     Handle ANNOTATION_UPDATED webhook from Label Studio.
 
     This endpoint is called when an existing annotation is modified.
-    It updates the stored annotation JSON.
+    It schedules an update of the stored annotation JSON and responds with
+    an empty 204 right away.
 
     Args:
         request: FastAPI request object
         background_tasks: Background task handler
 
     Returns:
-        WebhookResponse with processing status
+        Empty 204 response
 
     Raises:
         HTTPException: If processing fails
@@ -136,12 +182,11 @@ async def handle_annotation_updated(
 
     try:
         # Parse webhook payload
-        payload = await request.json()
-        logger.debug(f"Webhook payload: {payload}")
+        payload = await _read_payload(request)
+        logger.debug("Webhook payload: %s", payload)
 
         # Extract key information
-        annotation = payload.get("annotation", {})
-        task = payload.get("task", {})
+        annotation = payload.annotation
 
         if not annotation:
             raise HTTPException(
@@ -150,41 +195,28 @@ async def handle_annotation_updated(
             )
 
         # Get task metadata
-        task_meta = task.get("meta", {})
-        sha256 = task_meta.get("sha256")
-        original_filename = task_meta.get("original_filename")
-
-        if not sha256 or not original_filename:
-            raise HTTPException(
-                status_code=400,
-                detail="Missing SHA256 or filename in task metadata"
-            )
+        sha256 = payload.task.meta.sha256
+        original_filename = payload.task.meta.original_filename
 
         logger.info(
-            f"Updating annotation for: {original_filename} (SHA256: {sha256[:8]}...)"
+            "Updating annotation for: %s (SHA256: %s...)", original_filename, sha256[:8]
         )
 
-        # Update labeled image and annotation
-        result = storage_service.store_labeled_image(
+        # Update labeled image and annotation after responding
+        background_tasks.add_task(
+            _store_labeled_image_task,
             sha256=sha256,
             filename=original_filename,
             annotation_data=annotation
         )
 
-        logger.info(f"Annotation updated: {result['annotation_path']}")
-
-        return {
-            "status": "success",
-            "message": f"Annotation updated for {original_filename}",
-            "labeled_image_path": result["image_path"],
-            "annotation_path": result["annotation_path"]
-        }
+        return Response(status_code=204)
 
-    except HTTPException:
+    except (HTTPException, ValidationError):
         raise
 
     except Exception as e:
-        logger.error(f"Webhook processing failed: {e}", exc_info=True)
+        logger.error("Webhook processing failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to update annotation: {str(e)}"
@@ -192,7 +224,7 @@ async def handle_annotation_updated(
 
 
 @router.post("/test")
-async def test_webhook(request: Request) -> Dict[str, Any]:
+async def test_webhook(request: Request) -> ORJSONResponse:
     """
     Test endpoint for webhook configuration.
 
@@ -202,18 +234,18 @@ async def test_webhook(request: Request) -> Dict[str, Any]:
     logger.info("Received webhook test request")
 
     try:
-        payload = await request.json()
-        logger.debug(f"Test payload: {payload}")
+        payload = orjson.loads(await request.body())
+        logger.debug("Test payload: %s", payload)
 
-        return {
+        return ORJSONResponse(content={
             "status": "success",
             "message": "Webhook endpoint is working",
             "received": payload
-        }
+        })
 
     except Exception as e:
-        logger.error(f"Test webhook failed: {e}", exc_info=True)
-        return {
+        logger.error("Test webhook failed: %s", e, exc_info=True)
+        return ORJSONResponse(content={
             "status": "error",
             "message": str(e)
-        }
+        })
@@ -2,8 +2,9 @@
 Configuration management for Server 2 (Label Studio Service - Raspberry Pi 5)
 Uses Pydantic Settings for type-safe environment variable handling
 """
+import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -21,11 +22,13 @@ class Settings(BaseSettings):
     # Server configuration
     host: str = "0.0.0.0"
     port: int = 8002
+    uvicorn_workers: int = 1  # >1 runs several processes (no auto-reload); they share the Label Studio project
 
     # Storage configuration
     data_root: Path = Path("/data")
     unlabeled_dir: Path = Path("/data/unlabeled")
     labeled_dir: Path = Path("/data/labeled")
+    annotation_log_enabled: bool = True  # also append every annotation to labeled_dir/annotations.jsonl
 
     # Content-addressed storage (from main branch)
     use_content_addressing: bool = True  # SHA256-based deduplication
@@ -48,6 +51,22 @@ class Settings(BaseSettings):
     labelstudio_auto_create_project: bool = True
     labelstudio_enable_webhooks: bool = True
 
+    # Label Studio task batching (uploads arriving in a burst share one import call)
+    labelstudio_task_batch_size: int = 64
+    labelstudio_task_batch_wait_ms: int = 100
+
+    # Label Studio health check caching (seconds a probe result stays valid)
+    labelstudio_health_ttl_s: float = 5.0
+    labelstudio_stats_ttl_s: float = 5.0  # seconds project counters are reused by /status
+
+    # Seconds to wait for Label Studio at startup (readiness wait + connection retries)
+    labelstudio_startup_timeout_s: float = 120.0
+    labelstudio_retry_delay_cap: float = 5.0  # seconds, upper bound for a single retry delay
+
+    # Coordination between uvicorn workers during Label Studio initialization
+    labelstudio_init_lock_file: Path = Path("/tmp/labelstudio_init.lock")
+    labelstudio_project_id_file: Path = Path("/tmp/labelstudio_project_id")  # JSON with id, url and title; validated before reuse
+
     # Webhook configuration
     webhook_secret: Optional[str] = None  # Optional webhook signature verification
     webhook_enabled: bool = True
@@ -56,25 +75,45 @@ class Settings(BaseSettings):
     enable_file_watcher: bool = True
     file_watcher_recursive: bool = True
 
+    # CORS. Permissive by default, as before these were settings; deployments
+    # should narrow them to exact lists (e.g. ["http://localhost:8080"] for
+    # the Label Studio UI, ["GET", "POST"], ["authorization", "content-type"]),
+    # which also lets the middleware reuse precomputed header values
+    cors_allow_origins: List[str] = ["*"]
+    cors_allow_methods: List[str] = ["*"]
+    cors_allow_headers: List[str] = ["*"]
+
     # Logging
     log_level: str = "INFO"
     log_file: Optional[str] = None
 
     # Health check
     health_check_enabled: bool = True
+    storage_health_ttl_s: float = 30.0  # seconds a /health storage check result is reused
+    storage_scan_ttl_s: float = 5.0  # seconds an image directory scan is reused by listings / stats
 
     # Image formats
-    allowed_extensions: list[str] = [".jpg", ".jpeg", ".png", ".bmp"]
+    allowed_extensions: frozenset[str] = frozenset({".jpg", ".jpeg", ".png", ".bmp"})
+
+    @field_validator('allowed_extensions', mode='after')
+    @classmethod
+    def lowercase_extensions(cls, v):
+        """Store extensions lowercased so lookups are a single set membership test"""
+        return frozenset(ext.lower() for ext in v)
 
     # Performance tuning for Raspberry Pi 5
     max_upload_size_mb: int = 50
+    upload_buffer_size: int = 256 * 1024  # bytes per read when streaming uploads to disk
+    max_concurrent_uploads: int = 4  # uploads stored at the same time, others wait
+    upload_slot_timeout_s: float = 10.0  # seconds to wait for a slot before answering 503
     cleanup_temp_files: bool = True
 
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        frozen=True  # built once per process, never mutated
     )
 
     def __init__(self, **kwargs):
@@ -89,6 +128,11 @@ class Settings(BaseSettings):
         """Webhook URL for Label Studio to call"""
         return f"http://server2:{self.port}/api/v1/webhook/annotation-created"
 
+    @property
+    def annotation_log_path(self) -> Path:
+        """JSON Lines log of all saved annotations, one object per line"""
+        return self.labeled_dir / "annotations.jsonl"
+
     def get_unlabeled_path(self, sha256: str, filename: str) -> Path:
         """
         Get content-addressed path for unlabeled image.
@@ -102,8 +146,10 @@ class Settings(BaseSettings):
         """
         if self.use_content_addressing:
             # Content-addressed: /data/unlabeled/ab/cd/abcd.../filename.jpg
-            sub1, sub2 = sha256[:2], sha256[2:4]
-            return self.unlabeled_dir / sub1 / sub2 / sha256 / filename
+            # One join instead of four chained Path divisions
+            return Path(os.path.join(
+                self.unlabeled_dir, sha256[:2], sha256[2:4], sha256, filename
+            ))
         else:
             # Simple storage: /data/unlabeled/filename.jpg
             return self.unlabeled_dir / filename
@@ -2,18 +2,40 @@
 Main application entry point for Server 2 (Label Studio Service - Raspberry Pi 5)
 FastAPI application for PCB image storage and Label Studio integration
 """
-from fastapi import FastAPI
+import asyncio
+import orjson
+from typing import Optional, Tuple
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
+from pydantic import ValidationError
 from contextlib import asynccontextmanager
 from api.routes import router as api_router
 from api.webhooks import router as webhook_router
 from services.labelstudio_service import labelstudio_service
 from config.settings import settings
-from utils.logger import setup_logger
+from utils.logger import setup_logger, stop_log_listener
 
 logger = setup_logger(__name__, level=settings.log_level)
 
 
+async def _initialize_labelstudio() -> None:
+    """
+    Connect to Label Studio in the background.
+
+    Label Studio may still be starting when this service comes up, so the
+    retry loop runs as a task and the API starts serving right away.
+    """
+    try:
+        logger.info("Initializing Label Studio service...")
+        await labelstudio_service.initialize()
+        logger.info("Label Studio service initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize Label Studio: {e}", exc_info=True)
+        logger.warning("Service will continue without Label Studio integration")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -26,14 +48,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"Label Studio URL: {settings.labelstudio_url}")
 
     # Initialize Label Studio service
+    init_task = None
     if settings.labelstudio_api_key:
-        try:
-            logger.info("Initializing Label Studio service...")
-            labelstudio_service.initialize()
-            logger.info("Label Studio service initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Label Studio: {e}", exc_info=True)
-            logger.warning("Service will continue without Label Studio integration")
+        init_task = asyncio.create_task(_initialize_labelstudio())
     else:
         logger.warning("Label Studio API key not set - Label Studio integration disabled")
         logger.warning("Set LABELSTUDIO_API_KEY environment variable to enable")
@@ -42,6 +59,14 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info(f"Shutting down {settings.service_name}")
+    if init_task is not None and not init_task.done():
+        init_task.cancel()
+        try:
+            await init_task
+        except asyncio.CancelledError:
+            pass
+    await labelstudio_service.shutdown()
+    stop_log_listener()
 
 
 # Create FastAPI application
@@ -50,28 +75,51 @@ app = FastAPI(
     description="Raspberry Pi 5 - Image storage and Label Studio integration service",
     version=settings.service_version,
     lifespan=lifespan,
-    docs_url="/docs",
-    redoc_url="/redoc"
+    # Schema and docs routes are registered below so the schema is served
+    # from cached bytes
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware (for development/testing)
+OPENAPI_URL = "/openapi.json"
+
+# Serialized OpenAPI schema, built on the first request (routes are fixed by then)
+_openapi_body: Optional[bytes] = None
+
+# CORS middleware (origins/methods/headers from settings)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Restrict in production
+    allow_origins=settings.cors_allow_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=settings.cors_allow_methods,
+    allow_headers=settings.cors_allow_headers,
 )
 
+@app.exception_handler(ValidationError)
+async def validation_error_handler(request: Request, exc: ValidationError) -> ORJSONResponse:
+    """Return 400 for request bodies rejected by explicit pydantic validation"""
+    logger.error(f"Invalid payload for {request.url.path}: {exc}")
+    return ORJSONResponse(
+        status_code=400,
+        content={"detail": f"Invalid payload: {str(exc)}"}
+    )
+
+
 # Include API routes
 app.include_router(api_router)
 app.include_router(webhook_router)
 
 
-@app.get("/")
-async def root():
-    """Root endpoint with service information"""
-    return {
+# Serialized root() body and the project id it was built for; rebuilt only
+# when Label Studio initialization assigns (or changes) the project
+_root_body: Optional[Tuple[Optional[int], bytes]] = None
+
+
+def _build_root_body(project_id: Optional[int]) -> bytes:
+    """Serialize the service information returned by root()"""
+    return orjson.dumps({
         "service": settings.service_name,
         "version": settings.service_version,
         "description": "PCB Label Studio Service - Raspberry Pi 5 Simulator",
@@ -83,15 +131,48 @@ async def root():
             "labelstudio_stats": "GET /api/v1/labelstudio/stats - Label Studio statistics",
             "status": "GET /api/v1/status - Service status",
             "health": "GET /api/v1/health - Health check",
+            "live": "GET /api/v1/live - Liveness probe",
             "webhook_annotation": "POST /api/v1/webhook/annotation-created - Webhook endpoint",
             "docs": "GET /docs - Interactive API documentation"
         },
         "labelstudio": {
             "url": settings.labelstudio_url,
-            "initialized": labelstudio_service.project is not None,
-            "project_id": labelstudio_service.project.id if labelstudio_service.project else None
+            "initialized": project_id is not None,
+            "project_id": project_id
         }
-    }
+    })
+
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_schema() -> Response:
+    """OpenAPI schema, generated and serialized once per process"""
+    global _openapi_body
+    if _openapi_body is None:
+        _openapi_body = orjson.dumps(app.openapi())
+    return Response(content=_openapi_body, media_type="application/json")
+
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_docs() -> HTMLResponse:
+    """Interactive API documentation (Swagger UI)"""
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{app.title} - Swagger UI")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_docs() -> HTMLResponse:
+    """API documentation (ReDoc)"""
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc")
+
+
+@app.get("/")
+async def root() -> Response:
+    """Root endpoint with service information"""
+    global _root_body
+    project = labelstudio_service.project
+    project_id = project.id if project is not None else None
+    if _root_body is None or _root_body[0] != project_id:
+        _root_body = (project_id, _build_root_body(project_id))
+    return Response(content=_root_body[1], media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -99,10 +180,15 @@ if __name__ == "__main__":
 
     logger.info(f"Starting server on {settings.host}:{settings.port}")
 
+    # One process reloads on code changes (development); several workers
+    # use all Pi 5 cores. Workers coordinate Label Studio setup through
+    # labelstudio_init_lock_file / labelstudio_project_id_file.
+    workers = max(1, settings.uvicorn_workers)
     uvicorn.run(
         "main:app",
         host=settings.host,
         port=settings.port,
-        reload=True,  # Development mode
+        reload=workers == 1,
+        workers=workers,
         log_level=settings.log_level.lower()
     )
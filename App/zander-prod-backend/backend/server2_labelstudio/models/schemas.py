@@ -2,12 +2,17 @@
 Pydantic models for Server 2 (Label Studio Service)
 Data validation and serialization schemas
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
-class UploadResponse(BaseModel):
+class Schema(BaseModel):
+    """Base for all schemas: immutable once built, unknown fields dropped"""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+
+class UploadResponse(Schema):
     """Response model for image upload"""
     status: str = Field(..., description="Upload status: stored, already_stored, error")
     sha256: str = Field(..., description="SHA256 hash of the image")
@@ -18,7 +23,7 @@ class UploadResponse(BaseModel):
     message: Optional[str] = Field(None, description="Additional information")
 
 
-class ImageInfo(BaseModel):
+class ImageInfo(Schema):
     """Information about a stored image"""
     filename: str
     path: str
@@ -33,22 +38,33 @@ class LabeledImageInfo(ImageInfo):
     has_annotation: bool = False
 
 
-class StorageStats(BaseModel):
+class StorageStats(Schema):
     """Storage statistics"""
     unlabeled: Dict[str, Any]
     labeled: Dict[str, Any]
     total: Dict[str, Any]
 
 
-class WebhookPayload(BaseModel):
+class WebhookTaskMeta(Schema):
+    """Task metadata written by Server 2 when the task was created"""
+    sha256: str = Field(..., min_length=1, description="SHA256 hash of the image")
+    original_filename: str = Field(..., min_length=1, description="Original filename")
+
+
+class WebhookTask(Schema):
+    """Task section of a Label Studio webhook payload"""
+    meta: WebhookTaskMeta = Field(..., description="Task metadata")
+
+
+class WebhookPayload(Schema):
     """Label Studio webhook payload"""
-    action: str = Field(..., description="Webhook action: ANNOTATION_CREATED, ANNOTATION_UPDATED, etc.")
-    project: Dict[str, Any] = Field(..., description="Project information")
-    annotation: Optional[Dict[str, Any]] = Field(None, description="Annotation data")
-    task: Optional[Dict[str, Any]] = Field(None, description="Task data")
+    action: Optional[str] = Field(None, description="Webhook action: ANNOTATION_CREATED, ANNOTATION_UPDATED, etc.")
+    project: Optional[Dict[str, Any]] = Field(None, description="Project information")
+    annotation: Dict[str, Any] = Field(..., description="Annotation data")
+    task: WebhookTask = Field(..., description="Task data")
 
 
-class WebhookResponse(BaseModel):
+class WebhookResponse(Schema):
     """Response for webhook processing"""
     status: str = Field(..., description="Processing status: success, error")
     message: str = Field(..., description="Status message")
@@ -56,14 +72,14 @@ class WebhookResponse(BaseModel):
     annotation_path: Optional[str] = Field(None, description="Path to annotation JSON")
 
 
-class TaskCreateRequest(BaseModel):
+class TaskCreateRequest(Schema):
     """Request to create Label Studio task"""
     image_path: str = Field(..., description="Path to image file")
     sha256: str = Field(..., description="SHA256 hash")
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata")
 
 
-class TaskCreateResponse(BaseModel):
+class TaskCreateResponse(Schema):
     """Response for task creation"""
     status: str
     task_id: int
@@ -72,7 +88,7 @@ class TaskCreateResponse(BaseModel):
     sha256: str
 
 
-class HealthResponse(BaseModel):
+class HealthResponse(Schema):
     """Health check response"""
     status: str = Field(..., description="Health status: healthy, degraded, unhealthy")
     service: str = Field(..., description="Service name")
@@ -80,7 +96,7 @@ class HealthResponse(BaseModel):
     components: Optional[Dict[str, bool]] = Field(None, description="Component health status")
 
 
-class StatusResponse(BaseModel):
+class StatusResponse(Schema):
     """Service status response"""
     service: str
     version: str
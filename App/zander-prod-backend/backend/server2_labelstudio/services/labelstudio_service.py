@@ -2,10 +2,22 @@
 Label Studio Service for Server 2 (Raspberry Pi 5)
 Handles Label Studio API interactions, project setup, and task management
 """
+import asyncio
+import itertools
+import os
+import random
 import time
-from typing import Optional, Dict, Any, List
+from email.utils import parsedate_to_datetime
+import httpx
+import orjson
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
 # Import the v1 Client
 from label_studio_sdk import LabelStudio
 from config.settings import settings
@@ -36,6 +48,140 @@ LABELING_CONFIG = """
 </View>
 """
 
+# Local storage settings for the project (path is inside the Label Studio container)
+LOCAL_STORAGE_PATH = "/data/unlabeled"
+# Anchored, case-insensitive suffix match; no leading ".*" for the scanner to backtrack over
+IMAGE_REGEX_FILTER = r"(?i).+\.(jpe?g|png)\Z"
+IMAGE_URL_PREFIX = "/data/local-files/?d="  # Label Studio local-files serving endpoint
+
+# Data Manager filter selecting tasks that have been completed (labeled)
+COMPLETED_TASKS_QUERY = orjson.dumps({
+    "filters": {
+        "conjunction": "and",
+        "items": [{
+            "filter": "filter:tasks:completed_at",
+            "operator": "empty",
+            "type": "Datetime",
+            "value": False
+        }]
+    }
+}).decode("utf-8")
+
+
+async def _acquire_file_lock(path: Path, poll_interval: float = 0.2) -> Optional[int]:
+    """
+    Wait until an exclusive lock on path is held (POSIX only).
+
+    Polls with a non-blocking flock instead of blocking a worker thread, so
+    cancelling the caller (e.g. shutdown during startup) closes the file
+    descriptor right away and leaves no thread stuck in flock.
+
+    Returns:
+        File descriptor holding the lock, or None if locking is unavailable
+    """
+    if fcntl is None:
+        return None
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        logger.warning(f"Could not open init lock {path}: {e}")
+        return None
+
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                await asyncio.sleep(poll_interval)
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+def _release_file_lock(fd: Optional[int]) -> None:
+    """
+    Release a lock taken with _acquire_file_lock.
+    """
+    if fd is None:
+        return
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+# Label Studio responses meaning "not processed, try again later". A 504, a
+# plain 500 or a read timeout may already have created the tasks upstream,
+# so writes are only retried on these; reads also retry the others.
+TRANSIENT_STATUS_CODES = frozenset({429, 502, 503})
+IDEMPOTENT_RETRY_STATUS_CODES = TRANSIENT_STATUS_CODES | {500, 504}
+
+
+def _is_transient_error(error: Exception, idempotent: bool = False) -> bool:
+    """
+    Whether a failed Label Studio call is safe and worth retrying.
+
+    Reads (idempotent=True) may also be retried after a read timeout, a 504
+    or a plain 500, since repeating them cannot create anything twice.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    # SDK ApiError carries the HTTP status
+    status_code = getattr(error, "status_code", None)
+    if idempotent:
+        return isinstance(error, httpx.ReadTimeout) or status_code in IDEMPOTENT_RETRY_STATUS_CODES
+    return status_code in TRANSIENT_STATUS_CODES
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Seconds requested by a Retry-After header on a failed response, if any.
+
+    Works for SDK ApiError (headers attribute) and httpx.HTTPStatusError
+    (response.headers); both delta-seconds and HTTP-date forms are accepted.
+    """
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(error: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Delay before retry number attempt + 1: capped, jittered exponential
+    backoff, stretched to the server's Retry-After (still capped at max_delay).
+    """
+    delay = min(max_delay, base_delay * (2 ** attempt)) + random.uniform(0, base_delay)
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
+
+
+def _to_json_bytes(obj: Any) -> bytes:
+    """
+    Serialize an SDK object to JSON bytes.
+
+    SDK responses are pydantic models, so model_dump_json() serializes them
+    in pydantic-core without building an intermediate dict.
+    """
+    if hasattr(obj, "model_dump_json"):
+        return obj.model_dump_json(by_alias=True).encode("utf-8")
+    return orjson.dumps(obj.__dict__, default=str)
+
 
 class LabelStudioService:
     """
@@ -43,38 +189,211 @@ class LabelStudioService:
     Handles project creation, task management, and webhook configuration.
     """
 
+    # Resolved projects keyed by (Label Studio URL, project name), shared across
+    # instances so initialize() retries do not repeat the project lookup
+    _project_cache: Dict[Tuple[str, str], Any] = {}
+
+    # Local storage IDs keyed by (Label Studio URL, project ID), so a retried
+    # initialize() does not create and sync the storage a second time
+    _storage_cache: Dict[Tuple[str, int], int] = {}
+
     def __init__(self):
         self.ls_url = settings.labelstudio_url
         self.api_key = settings.labelstudio_api_key
         self.project_id = settings.labelstudio_project_id
         self.project_name = settings.labelstudio_project_name
 
+        # data_root as a string prefix, used to build task image URLs
+        self._data_root_str = str(settings.data_root).rstrip("/") + "/"
+
         # v1 Client Type Hinting
         self.client: Optional[LabelStudio] = None
         self.project = None
 
+        # When self.project was last re-fetched for its task counters
+        self._project_refreshed_at = float("-inf")
+
+        # Shared HTTP connection pool for all SDK calls (created in initialize)
+        self._http_client: Optional[httpx.Client] = None
+
+        # initialize() coalescing and negative caching
+        self._init_lock: Optional[asyncio.Lock] = None
+        self._init_failed_at: Optional[float] = None
+        self._init_failure_ttl: float = 0.0
+
+        # Task creation batching (queue and worker are created on first use,
+        # inside the running event loop)
+        self._task_queue: Optional[asyncio.Queue] = None
+        self._task_worker: Optional[asyncio.Task] = None
+
+        # Cached health probe result as (healthy, monotonic timestamp)
+        self._health: Optional[Tuple[bool, float]] = None
+        self._health_lock: Optional[asyncio.Lock] = None
+
         logger.info(f"LabelStudioService initialized: url={self.ls_url}")
 
-    def initialize(self, max_retries: int = 10, retry_delay: float = 3.0) -> None:
+    async def initialize(self, retry_delay: float = 0.5) -> None:
         """
         Initialize Label Studio client and project with retry logic.
+
+        Blocking SDK calls run in a worker thread and retries wait with
+        asyncio.sleep, so the event loop keeps serving requests meanwhile.
+
+        Concurrent calls are coalesced: within a process they share one
+        asyncio.Lock, and across uvicorn workers a file lock lets a single
+        worker run the retry ladder while the others reuse the project ID it
+        publishes. A failed initialization is remembered for
+        min(retry_delay, 30s) so repeated calls fail fast during an outage
+        without locking other workers out for long.
         """
         if not self.api_key:
             logger.warning("Label Studio API key not set.")
             raise RuntimeError("Label Studio API key not configured")
 
-        for attempt in range(1, max_retries + 1):
+        if self.project:
+            return
+        self._raise_if_recently_failed()
+
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+
+        async with self._init_lock:
+            # Another caller may have finished while we waited for the lock
+            if self.project:
+                return
+            self._raise_if_recently_failed()
+
+            lock_fd = await _acquire_file_lock(settings.labelstudio_init_lock_file)
+            try:
+                if await self._connect_to_shared_project():
+                    return
+                await self._connect(retry_delay)
+                self._publish_project_id()
+                self._init_failed_at = None
+            except Exception:
+                self._init_failed_at = time.monotonic()
+                self._init_failure_ttl = min(retry_delay, 30.0)
+                raise
+            finally:
+                _release_file_lock(lock_fd)
+
+    def _raise_if_recently_failed(self) -> None:
+        """
+        Short-circuit initialize() while a recent failure is still cached.
+        """
+        if (
+            self._init_failed_at is not None
+            and time.monotonic() - self._init_failed_at < self._init_failure_ttl
+        ):
+            raise RuntimeError("Label Studio initialization failed recently, not retrying yet")
+
+    async def _connect_to_shared_project(self) -> bool:
+        """
+        Reuse a project ID published by another worker, if any.
+
+        The file is only trusted when it was written for the same Label
+        Studio URL and project name, and the project still has that title;
+        otherwise (settings changed, stale file from another setup) the
+        normal path runs, including local storage and webhook setup.
+
+        Returns:
+            True if the shared project was loaded
+        """
+        if self.project_id:
+            return False
+
+        try:
+            shared = orjson.loads(settings.labelstudio_project_id_file.read_bytes())
+            shared_id = int(shared["project_id"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return False
+
+        if shared.get("url") != self.ls_url or shared.get("title") != self.project_name:
+            logger.info("Ignoring shared project ID written for another Label Studio setup")
+            return False
+
+        try:
+            self.client = self._build_client()
+            project = await asyncio.to_thread(self.client.projects.get, id=shared_id)
+            if project.title != self.project_name:
+                logger.info(
+                    f"Shared project {shared_id} is titled {project.title!r}, "
+                    f"expected {self.project_name!r}; initializing normally"
+                )
+                return False
+            self.project = project
+            logger.info(f"✓ Label Studio connected! Using shared project: ID={self.project.id}")
+            return True
+        except Exception as e:
+            logger.warning(f"Shared project {shared_id} unavailable, initializing normally: {e}")
+            self.project = None
+            return False
+
+    def _publish_project_id(self) -> None:
+        """
+        Write the resolved project ID for other workers to reuse, together
+        with the URL and project name it was resolved for.
+        """
+        try:
+            settings.labelstudio_project_id_file.write_bytes(orjson.dumps({
+                "project_id": self.project.id,
+                "url": self.ls_url,
+                "title": self.project_name
+            }))
+        except OSError as e:
+            logger.warning(f"Could not publish project ID: {e}")
+
+    def _build_client(self) -> LabelStudio:
+        """
+        Build a LabelStudio client on the shared keep-alive connection pool.
+        """
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                timeout=30.0,
+                # Pool limits belong to the transport: httpx.Client ignores
+                # its own limits argument when a transport is given. Retries
+                # failed connection attempts on the pooled transport.
+                transport=httpx.HTTPTransport(
+                    retries=3,
+                    limits=httpx.Limits(max_keepalive_connections=8, max_connections=32)
+                )
+            )
+        return LabelStudio(
+            base_url=self.ls_url,
+            api_key=self.api_key,
+            httpx_client=self._http_client
+        )
+
+    async def _connect(self, retry_delay: float) -> None:
+        """
+        Connect to Label Studio and resolve the project, retrying with backoff.
+
+        Retries are bounded by labelstudio_startup_timeout_s rather than an
+        attempt count. The delay doubles from retry_delay, is capped at
+        labelstudio_retry_delay_cap and jittered, so a Label Studio that
+        comes up after a few seconds is picked up promptly.
+        """
+        timeout = settings.labelstudio_startup_timeout_s
+        deadline = time.monotonic() + timeout
+        await self._wait_for_labelstudio(timeout)
+
+        delay = retry_delay
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                logger.info(f"Connecting to Label Studio at {self.ls_url} (attempt {attempt}/{max_retries})")
-                
+                logger.info(f"Connecting to Label Studio at {self.ls_url} (attempt {attempt})")
+
                 # Initialize v1 Client
-                self.client = LabelStudio(base_url=self.ls_url, api_key=self.api_key)
+                self.client = self._build_client()
 
                 # Get or Create Project
                 if self.project_id:
-                    self.project = self.client.projects.get(id=self.project_id)
+                    self.project = await asyncio.to_thread(
+                        self.client.projects.get, id=self.project_id
+                    )
                 else:
-                    self.project = self._create_or_get_project()
+                    self.project = await asyncio.to_thread(self._create_or_get_project)
 
                 if self.project:
                     logger.info(f"✓ Label Studio connected! Project ready: ID={self.project.id}")
@@ -85,32 +404,69 @@ class LabelStudioService:
                     raise RuntimeError("Failed to initialize Label Studio project")
 
             except Exception as e:
-                if attempt < max_retries:
-                    delay = retry_delay * (1.5 ** (attempt - 1))
-                    logger.warning(f"Connection failed: {str(e)[:100]}. Retrying in {delay:.1f}s...")
-                    time.sleep(delay)
+                sleep_for = min(delay, settings.labelstudio_retry_delay_cap) + random.uniform(0, 0.25)
+                if time.monotonic() + sleep_for < deadline:
+                    logger.warning(f"Connection failed: {str(e)[:100]}. Retrying in {sleep_for:.1f}s...")
+                    await asyncio.sleep(sleep_for)
+                    delay *= 2
                 else:
                     logger.error(f"Initialization failed: {e}", exc_info=True)
                     raise RuntimeError(f"Label Studio initialization failed: {e}") from e
 
+    async def _wait_for_labelstudio(self, timeout: float, poll_interval: float = 2.0) -> bool:
+        """
+        Wait until Label Studio answers its /health endpoint.
+
+        Polls over a single pooled connection using HEAD (falling back to GET
+        if HEAD is rejected) until the deadline passes.
+
+        Returns:
+            True if Label Studio became reachable before the deadline
+        """
+        deadline = time.monotonic() + timeout
+        method = "HEAD"
+
+        async with httpx.AsyncClient(base_url=self.ls_url, timeout=5.0) as client:
+            while True:
+                try:
+                    response = await client.request(method, "/health")
+                    if response.status_code == 405 and method == "HEAD":
+                        method = "GET"
+                        continue
+                    if response.status_code < 500:
+                        logger.info(f"Label Studio is reachable at {self.ls_url}")
+                        return True
+                except httpx.HTTPError as e:
+                    logger.debug(f"Label Studio not reachable yet: {e}")
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(
+                        f"Label Studio not reachable after {timeout:.0f}s, "
+                        f"continuing with connection retries"
+                    )
+                    return False
+                await asyncio.sleep(min(poll_interval, remaining))
+
     def _create_or_get_project(self):
         """
         Create new project or get existing by name.
         """
+        cache_key = (self.ls_url, self.project_name)
+        cached = self._project_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached project: {cached.id} - {cached.title}")
+            return cached
+
         try:
-            # List projects using v1 SDK
-            projects_page = self.client.projects.list()
-            # Handle pagination if present (SDK specific)
-            projects = getattr(projects_page, 'results', projects_page)
-            
-            # Use property access (.title) instead of dict access (['title'])
-            for proj in projects:
-                if proj.title == self.project_name:
-                    logger.info(f"Found existing project: {proj.id} - {proj.title}")
-                    # Fetch full details
-                    fullproject = self.client.projects.get(id=proj.id)
-                    self._setup_local_storage(proj.id)
-                    return fullproject
+            existing = self._find_project_by_title()
+            if existing is not None:
+                logger.info(f"Found existing project: {existing.id} - {existing.title}")
+                # Fetch full details
+                fullproject = self.client.projects.get(id=existing.id)
+                self._setup_local_storage(existing.id)
+                self._project_cache[cache_key] = fullproject
+                return fullproject
 
             # Create new project
             logger.info(f"Creating new project: {self.project_name}")
@@ -122,29 +478,63 @@ class LabelStudioService:
 
             logger.info(f"Created project: {project.id}")
             self._setup_local_storage(project.id)
+            self._project_cache[cache_key] = project
             return project
 
         except Exception as e:
             logger.error(f"Failed to create project: {e}", exc_info=True)
             raise RuntimeError(f"Project creation failed: {e}") from e
 
+    def _find_project_by_title(self):
+        """
+        Find a project whose title matches the configured project name.
+
+        Asks Label Studio to filter by title so only matching projects are
+        sent over the wire. Falls back to listing every project if the server
+        or SDK rejects the filter.
+        """
+        try:
+            projects_page = self.client.projects.list(title=self.project_name)
+        except Exception as e:
+            logger.warning(f"Server-side title filter unavailable, listing all projects: {e}")
+            projects_page = self.client.projects.list()
+
+        # Handle pagination if present (SDK specific)
+        projects = getattr(projects_page, 'results', projects_page)
+
+        # The title filter is a substring match, so still compare exactly.
+        # Use property access (.title) instead of dict access (['title'])
+        for proj in projects:
+            if proj.title == self.project_name:
+                return proj
+        return None
+
     def _setup_local_storage(self, project_id: int) -> None:
         """
         Configure local file storage for the project using v1 SDK.
         """
-        try:    
+        cache_key = (self.ls_url, project_id)
+        if cache_key in self._storage_cache:
+            logger.info(
+                f"Local storage already configured for project {project_id}, "
+                f"ID={self._storage_cache[cache_key]}"
+            )
+            return
+
+        try:
             logger.info(f"Creating local storage for project {project_id}")
             # Use the v1 API for storage creation
             storage = self.client.import_storage.local.create(
                 project=project_id,
-                path="/data/unlabeled",  # Path inside the container
+                path=LOCAL_STORAGE_PATH,
                 use_blob_urls=False,
-                regex_filter=".*\\.(jpg|jpeg|png)$",
+                regex_filter=IMAGE_REGEX_FILTER,
                 title="Local Storage"
             )
             # Sync to index existing files
             self.client.import_storage.local.sync(id=storage.id)
-            
+            self._storage_cache[cache_key] = storage.id
+
             logger.info(f"Local storage configured for project {project_id}, ID={storage.id}")
         except Exception as e:
             # It's possible storage already exists, which might throw an error.
@@ -157,7 +547,7 @@ class LabelStudioService:
         webhook_url = settings.labelstudio_webhook_url
         logger.info(f"Webhook configuration required: {webhook_url}")
 
-    def create_task_from_image(
+    async def create_task_from_image(
         self,
         image_path: Path,
         sha256: str,
@@ -165,98 +555,341 @@ class LabelStudioService:
     ) -> Dict[str, Any]:
         """
         Create Label Studio task from stored image using v1 SDK.
+
+        Tasks are queued and created in batches, so a burst of uploads
+        shares a single import request to Label Studio.
         """
         if not self.project:
             raise RuntimeError("Label Studio project not initialized")
 
         try:
-            # Construct image URL (path query for local files)
-            relative_path = str(image_path.relative_to(settings.data_root))
-            image_url = f"/data/local-files/?d={relative_path}"
-
-            # Prepare data and meta
-            task_data = {"image": image_url}
-            task_meta = {
-                "sha256": sha256,
-                "original_filename": image_path.name,
-                "upload_timestamp": time.time()
-            }
-            if metadata:
-                task_meta.update(metadata)
+            task = self._build_task(image_path, sha256, metadata)
 
-            logger.info(f"Creating task for image: {image_path.name}")
+            logger.info(f"Queueing task for image: {image_path.name}")
 
-            # --- CORRECTED v1 SDK USAGE ---
-            task = self.client.tasks.create(
-                project=self.project.id,
-                data=task_data,
-                meta=task_meta
-            )
+            future = asyncio.get_running_loop().create_future()
+            self._ensure_task_worker()
+            await self._task_queue.put((task, future))
+            task_id = await future
 
-            # Note: `task` is an object, access ID via .id
-            logger.info(f"Task created: ID={task.id}")
+            logger.info(f"Task created: ID={task_id}")
 
-            return {
-                "status": "created",
-                "task_id": task.id,
-                "project_id": self.project.id,
-                "image_url": image_url,
-                "sha256": sha256
-            }
+            return self._task_result(task, task_id)
 
         except Exception as e:
             logger.error(f"Failed to create task: {e}", exc_info=True)
             raise RuntimeError(f"Task creation failed: {e}") from e
 
-    def get_task(self, task_id: int) -> Dict[str, Any]:
+    async def create_tasks_from_images(
+        self,
+        images: List[Tuple[Path, str]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Create Label Studio tasks for several stored images in one import.
+
+        Args:
+            images: (image_path, sha256) pairs
+
+        Returns:
+            Task results in the same order as images
+        """
+        if not self.project:
+            raise RuntimeError("Label Studio project not initialized")
+        if not images:
+            return []
+
+        try:
+            tasks = [self._build_task(path, sha256) for path, sha256 in images]
+
+            logger.info(f"Creating {len(tasks)} tasks in one import")
+            task_ids = await self._call_with_retries(self._create_tasks, tasks)
+
+            return [self._task_result(task, task_id) for task, task_id in zip(tasks, task_ids)]
+
+        except Exception as e:
+            logger.error(f"Failed to create tasks: {e}", exc_info=True)
+            raise RuntimeError(f"Task creation failed: {e}") from e
+
+    def _build_task(
+        self,
+        image_path: Path,
+        sha256: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the Label Studio task payload (data + meta) for a stored image.
+        """
+        # Construct image URL (path query for local files)
+        image_path_str = str(image_path)
+        if image_path_str.startswith(self._data_root_str):
+            relative_path = image_path_str[len(self._data_root_str):]
+        else:
+            relative_path = str(image_path.relative_to(settings.data_root))
+        image_url = IMAGE_URL_PREFIX + relative_path
+
+        # Prepare data and meta
+        task_meta = {
+            "sha256": sha256,
+            "original_filename": image_path.name,
+            "upload_timestamp": time.time()
+        }
+        if metadata:
+            task_meta.update(metadata)
+
+        return {"data": {"image": image_url}, "meta": task_meta}
+
+    def _task_result(self, task: Dict[str, Any], task_id: int) -> Dict[str, Any]:
+        """
+        Result returned to callers for a created task.
+        """
+        return {
+            "status": "created",
+            "task_id": task_id,
+            "project_id": self.project.id,
+            "image_url": task["data"]["image"],
+            "sha256": task["meta"]["sha256"]
+        }
+
+    def _ensure_task_worker(self) -> None:
+        """
+        Start the task batching worker if it is not running.
+        """
+        if self._task_queue is None:
+            self._task_queue = asyncio.Queue()
+        if self._task_worker is None or self._task_worker.done():
+            self._task_worker = asyncio.create_task(self._run_task_worker())
+
+    async def _run_task_worker(self) -> None:
+        """
+        Drain queued tasks and create them in batches.
+
+        A task that arrives while the queue is otherwise empty is created
+        immediately. If more tasks are waiting, up to
+        labelstudio_task_batch_size of them are collected (waiting at most
+        labelstudio_task_batch_wait_ms) and imported in one request.
+        """
+        queue = self._task_queue
+        max_batch = max(1, settings.labelstudio_task_batch_size)
+        max_wait = settings.labelstudio_task_batch_wait_ms / 1000
+
+        while True:
+            batch = [await queue.get()]
+            try:
+                await self._create_batch(batch, queue, max_batch, max_wait)
+            except asyncio.CancelledError:
+                # Shutdown: tasks already taken off the queue would otherwise
+                # leave their uploads waiting forever
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Label Studio service shutting down"))
+                raise
+
+    async def _create_batch(
+        self,
+        batch: List[Tuple[Dict[str, Any], asyncio.Future]],
+        queue: asyncio.Queue,
+        max_batch: int,
+        max_wait: float
+    ) -> None:
+        """
+        Top up batch from the queue and create its tasks in one import,
+        resolving each caller's future. The batch list is extended in place
+        so the worker can fail every collected future on cancellation.
+        """
+        if not queue.empty():
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + max_wait
+            while len(batch) < max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+        tasks = [task for task, _ in batch]
+        futures = [future for _, future in batch]
+
+        try:
+            task_ids = await self._call_with_retries(self._create_tasks, tasks)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, task_id in zip(futures, task_ids):
+            if not future.done():
+                future.set_result(task_id)
+
+    async def _call_with_retries(
+        self,
+        fn,
+        *args,
+        attempts: int = 3,
+        base_delay: float = 0.3,
+        max_delay: float = 5.0
+    ):
+        """
+        Run a blocking SDK call in a thread, retrying transient failures.
+
+        Connection errors and 429/502/503 responses are retried with
+        capped, jittered exponential backoff, waiting at least as long as a
+        Retry-After header asks (up to max_delay); anything else is raised
+        right away.
+        """
+        for attempt in range(attempts):
+            try:
+                return await asyncio.to_thread(fn, *args)
+            except Exception as e:
+                if attempt == attempts - 1 or not _is_transient_error(e):
+                    raise
+                delay = _retry_delay(e, attempt, base_delay, max_delay)
+                logger.warning(
+                    "Label Studio call failed (%s), retry %d/%d in %.1fs",
+                    e, attempt + 1, attempts - 1, delay
+                )
+                await asyncio.sleep(delay)
+
+    def _read_with_retries(
+        self,
+        fn,
+        *args,
+        attempts: int = 3,
+        base_delay: float = 0.3,
+        max_delay: float = 5.0,
+        **kwargs
+    ):
         """
-        Get task by ID.
+        Blocking counterpart of _call_with_retries for read-only SDK calls.
+
+        The read methods below run in the threadpool (run_in_threadpool from
+        the routes), so waiting with time.sleep only holds that worker.
+        Reads are idempotent, so read timeouts and 500s are retried too.
+        """
+        for attempt in range(attempts):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == attempts - 1 or not _is_transient_error(e, idempotent=True):
+                    raise
+                delay = _retry_delay(e, attempt, base_delay, max_delay)
+                logger.warning(
+                    "Label Studio read failed (%s), retry %d/%d in %.1fs",
+                    e, attempt + 1, attempts - 1, delay
+                )
+                time.sleep(delay)
+
+    def _create_tasks(self, tasks: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create tasks in Label Studio, returning their IDs in input order.
+        """
+        if len(tasks) == 1:
+            task = self.client.tasks.create(
+                project=self.project.id,
+                data=tasks[0]["data"],
+                meta=tasks[0]["meta"]
+            )
+            # Note: `task` is an object, access ID via .id
+            return [task.id]
+
+        logger.info(f"Importing {len(tasks)} tasks in one batch")
+        response = self.client.projects.import_tasks(
+            id=self.project.id,
+            request=tasks,
+            return_task_ids=True
+        )
+        task_ids = list(getattr(response, "task_ids", None) or [])
+        if len(task_ids) != len(tasks):
+            raise RuntimeError(
+                f"Label Studio returned {len(task_ids)} task IDs for {len(tasks)} tasks"
+            )
+        return task_ids
+
+    async def shutdown(self) -> None:
+        """
+        Stop the task batching worker, fail any tasks still queued and
+        close the HTTP connection pool.
+
+        The published project ID is left in place: other workers may still
+        be running, and a stale file is rejected by the checks in
+        _connect_to_shared_project on the next start.
+        """
+        if self._task_worker is not None:
+            self._task_worker.cancel()
+            try:
+                await self._task_worker
+            except asyncio.CancelledError:
+                pass
+            self._task_worker = None
+
+        if self._task_queue is not None:
+            while not self._task_queue.empty():
+                _, future = self._task_queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Label Studio service shutting down"))
+
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+
+    def get_task(self, task_id: int) -> bytes:
+        """
+        Get task by ID as JSON bytes (ready to return as a Response body).
         """
         if not self.project:
             raise RuntimeError("Label Studio project not initialized")
 
         try:
-            task = self.client.tasks.get(id=task_id)
-            # Convert object to dict for consistency
-            return task.model_dump() if hasattr(task, 'model_dump') else task.__dict__
+            task = self._read_with_retries(self.client.tasks.get, id=task_id)
+            return _to_json_bytes(task)
         except Exception as e:
             logger.error(f"Failed to get task {task_id}: {e}", exc_info=True)
             raise RuntimeError(f"Task retrieval failed: {e}") from e
 
-    def get_annotation(self, annotation_id: int) -> Dict[str, Any]:
+    def get_annotation(self, annotation_id: int) -> bytes:
         """
-        Get annotation by ID using v1 SDK.
+        Get annotation by ID using v1 SDK, as JSON bytes.
         """
         try:
             # Use .annotations.get
-            annotation = self.client.annotations.get(id=annotation_id)
-            return annotation.model_dump() if hasattr(annotation, 'model_dump') else annotation.__dict__
+            annotation = self._read_with_retries(self.client.annotations.get, id=annotation_id)
+            return _to_json_bytes(annotation)
 
         except Exception as e:
             logger.error(f"Failed to get annotation {annotation_id}: {e}", exc_info=True)
             raise RuntimeError(f"Annotation retrieval failed: {e}") from e
 
-    def list_tasks(self, limit: int = 100, completed_only: bool = False) -> List[Dict[str, Any]]:
+    def list_tasks(self, limit: int = 100, completed_only: bool = False) -> bytes:
         """
-        List tasks in project.
+        List tasks in project as a JSON array (bytes).
+
+        With completed_only, Label Studio filters to tasks that have been
+        completed, so unlabeled tasks never cross the wire.
         """
         if not self.project:
             raise RuntimeError("Label Studio project not initialized")
 
         try:
             # v1 SDK list tasks
-            tasks_page = self.client.tasks.list(
-                project=self.project.id,
-                page_size=limit
-            )
-            tasks = getattr(tasks_page, 'results', tasks_page)
-            
-            # Convert objects to dicts
-            return [t.model_dump() if hasattr(t, 'model_dump') else t.__dict__ for t in tasks]
+            params = {"project": self.project.id, "page_size": limit}
+            if completed_only:
+                params["query"] = COMPLETED_TASKS_QUERY
+            def fetch_page() -> bytes:
+                tasks_page = self.client.tasks.list(**params)
+                tasks = getattr(tasks_page, 'results', tasks_page)
+
+                # The pager follows further pages on iteration, so stop at
+                # limit. Join the per-task JSON directly, no intermediate dicts
+                return b"[" + b",".join(_to_json_bytes(t) for t in itertools.islice(tasks, limit)) + b"]"
+
+            # Page iteration makes further requests, so it is retried as a whole
+            return self._read_with_retries(fetch_page)
 
         except Exception as e:
             logger.error(f"Failed to list tasks: {e}", exc_info=True)
-            return []
+            return b"[]"
 
     def get_project_stats(self) -> Dict[str, Any]:
         """
@@ -266,8 +899,11 @@ class LabelStudioService:
             return {"error": "Project not initialized"}
 
         try:
-            # Refresh project object
-            self.project = self.client.projects.get(id=self.project.id)
+            # Refresh project object, at most once per labelstudio_stats_ttl_s
+            now = time.monotonic()
+            if now - self._project_refreshed_at >= settings.labelstudio_stats_ttl_s:
+                self.project = self._read_with_retries(self.client.projects.get, id=self.project.id)
+                self._project_refreshed_at = now
 
             return {
                 "project_id": self.project.id,
@@ -279,15 +915,49 @@ class LabelStudioService:
 
         except Exception as e:
             logger.error(f"Failed to get project stats: {e}", exc_info=True)
+            # Force a fresh fetch on the next call
+            self._project_refreshed_at = float("-inf")
             return {"error": str(e)}
 
-    def is_healthy(self) -> bool:
+    async def is_healthy(self, refresh: bool = False) -> bool:
         """
         Check if Label Studio service is healthy.
+
+        The probe result is cached for labelstudio_health_ttl_s seconds and
+        concurrent callers share a single upstream request.
+        """
+        if not self.client:
+            return False
+
+        if not refresh and self._health_is_fresh():
+            return self._health[0]
+
+        if self._health_lock is None:
+            self._health_lock = asyncio.Lock()
+
+        async with self._health_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if not refresh and self._health_is_fresh():
+                return self._health[0]
+
+            healthy = await asyncio.to_thread(self._probe_health)
+            self._health = (healthy, time.monotonic())
+            return healthy
+
+    def _health_is_fresh(self) -> bool:
+        """
+        Check whether the cached health result is still within its TTL.
+        """
+        return (
+            self._health is not None
+            and time.monotonic() - self._health[1] < settings.labelstudio_health_ttl_s
+        )
+
+    def _probe_health(self) -> bool:
+        """
+        Probe Label Studio with a minimal API call.
         """
         try:
-            if not self.client:
-                return False
             # Simple list call to check connection
             self.client.projects.list(page_size=1)
             return True
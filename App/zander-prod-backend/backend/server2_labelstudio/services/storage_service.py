@@ -3,15 +3,35 @@ Storage Service for Server 2 (Raspberry Pi 5)
 Handles content-addressed storage for unlabeled and labeled images
 Based on the main branch implementation with enhancements
 """
+import errno
 import hashlib
+import heapq
+import mmap
+import os
 import shutil
+import tempfile
+import threading
+import time
+import orjson
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, NamedTuple, Tuple
 from config.settings import settings
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__, level=settings.log_level)
 
+# OpenSSL's sha256 uses the CPU's SHA extensions (ARMv8 crypto on the Pi,
+# SHA-NI on x86); the builtin fallback is several times slower
+SHA256_OPENSSL = type(hashlib.sha256()).__module__ == "_hashlib"
+
+
+class ScannedImage(NamedTuple):
+    """Image file found by a directory scan, stat'ed once at scan time."""
+    name: str
+    path: str
+    mtime: float
+    size: int
+
 
 class StorageService:
     """
@@ -24,17 +44,29 @@ class StorageService:
         self.labeled_dir = settings.labeled_dir
         self.use_content_addressing = settings.use_content_addressing
 
+        # Directory scans reused by listings and statistics, keyed by
+        # (directory, recursive) -> (write generation, monotonic time, images);
+        # bumped on every store so this process's own writes show up at once
+        self._write_generation = 0
+        self._generation_lock = threading.Lock()
+        self._scan_cache: Dict[Tuple[str, bool], Tuple[int, float, List[ScannedImage]]] = {}
+
         logger.info(
-            f"StorageService initialized: "
-            f"unlabeled={self.unlabeled_dir}, "
-            f"labeled={self.labeled_dir}, "
-            f"content_addressing={self.use_content_addressing}"
+            "StorageService initialized: unlabeled=%s, labeled=%s, content_addressing=%s",
+            self.unlabeled_dir, self.labeled_dir, self.use_content_addressing
         )
 
+        if not SHA256_OPENSSL:
+            logger.warning(
+                "hashlib sha256 is not backed by OpenSSL, "
+                "upload hashing will not use hardware acceleration"
+            )
+
     def store_unlabeled_image(
         self,
         source_path: Path,
-        filename: str
+        filename: str,
+        sha256: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Store uploaded image in unlabeled database.
@@ -42,6 +74,7 @@ class StorageService:
         Args:
             source_path: Path to temporary uploaded file
             filename: Original filename
+            sha256: SHA256 hash if already computed while receiving the file
 
         Returns:
             Dictionary with storage information
@@ -55,19 +88,20 @@ class StorageService:
         if ext not in settings.allowed_extensions:
             raise ValueError(
                 f"File extension {ext} not allowed. "
-                f"Allowed: {settings.allowed_extensions}"
+                f"Allowed: {sorted(settings.allowed_extensions)}"
             )
 
-        # Calculate SHA256 hash
-        sha256 = self._calculate_sha256(source_path)
-        logger.info(f"File hash: {sha256}")
+        # Calculate SHA256 hash unless the caller already did
+        if sha256 is None:
+            sha256 = self._calculate_sha256(source_path)
+        logger.info("File hash: %s", sha256)
 
         # Get destination path
         dest_path = settings.get_unlabeled_path(sha256, filename)
 
         # Check if already exists (deduplication)
         if dest_path.exists():
-            logger.info(f"Image already exists: {dest_path}")
+            logger.info("Image already exists: %s", dest_path)
             # Clean up source
             if source_path.exists():
                 source_path.unlink()
@@ -83,10 +117,12 @@ class StorageService:
         # Create parent directories
         dest_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Move file to destination (atomic operation)
+        # Rename into place (atomic; uploads are staged under data_root, on
+        # the same filesystem as the store)
         try:
-            shutil.move(str(source_path), str(dest_path))
-            logger.info(f"Image stored: {dest_path}")
+            os.replace(source_path, dest_path)
+            self._bump_write_generation()
+            logger.info("Image stored: %s", dest_path)
 
             return {
                 "status": "stored",
@@ -97,9 +133,43 @@ class StorageService:
             }
 
         except Exception as e:
-            logger.error(f"Failed to store image: {e}", exc_info=True)
+            logger.error("Failed to store image: %s", e, exc_info=True)
             raise IOError(f"Storage failed: {e}") from e
 
+    def find_unlabeled_image(self, sha256: str, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an image already stored under a known hash.
+
+        Lets an upload that announces its SHA256 skip the temp file and
+        copy when the content is already stored. The caller must still
+        check the upload body against the returned size and hash.
+
+        Args:
+            sha256: SHA256 hash (lowercase hex) claimed for the file
+            filename: Original filename
+
+        Returns:
+            Storage information with status "already_stored", or None if
+            no such image is stored
+        """
+        if Path(filename).suffix.lower() not in settings.allowed_extensions:
+            return None
+
+        dest_path = settings.get_unlabeled_path(sha256, filename)
+        try:
+            size_bytes = dest_path.stat().st_size
+        except FileNotFoundError:
+            return None
+
+        logger.info("Image already exists (announced hash): %s", dest_path)
+        return {
+            "status": "already_stored",
+            "sha256": sha256,
+            "path": str(dest_path),
+            "filename": filename,
+            "size_bytes": size_bytes
+        }
+
     def store_labeled_image(
         self,
         sha256: str,
@@ -135,9 +205,10 @@ class StorageService:
 
         # Check if already exists
         if dest_image_path.exists():
-            logger.info(f"Labeled image already exists: {dest_image_path}")
+            logger.info("Labeled image already exists: %s", dest_image_path)
             # Update annotation even if image exists
             self._save_annotation(dest_annotation_path, annotation_data)
+            self._append_annotation_log(sha256, filename, annotation_data)
 
             return {
                 "status": "updated",
@@ -147,17 +218,25 @@ class StorageService:
                 "filename": filename
             }
 
-        # Copy image to labeled directory (keep original in unlabeled)
+        # Link or copy image to labeled directory (keep original in unlabeled)
+        created_image = False
         try:
-            shutil.copy2(str(source_path), str(dest_image_path))
-            logger.info(f"Labeled image stored: {dest_image_path}")
+            created_image = self._link_or_copy_image(source_path, dest_image_path)
+            if created_image:
+                self._bump_write_generation()
+                logger.info("Labeled image stored: %s", dest_image_path)
+            else:
+                # A concurrent webhook for the same image placed it first;
+                # content-addressed, so the existing file is identical
+                logger.info("Labeled image already exists: %s", dest_image_path)
 
             # Save annotation JSON
             self._save_annotation(dest_annotation_path, annotation_data)
-            logger.info(f"Annotation stored: {dest_annotation_path}")
+            logger.info("Annotation stored: %s", dest_annotation_path)
+            self._append_annotation_log(sha256, filename, annotation_data)
 
             return {
-                "status": "stored",
+                "status": "stored" if created_image else "updated",
                 "sha256": sha256,
                 "image_path": str(dest_image_path),
                 "annotation_path": str(dest_annotation_path),
@@ -166,18 +245,91 @@ class StorageService:
             }
 
         except Exception as e:
-            logger.error(f"Failed to store labeled image: {e}", exc_info=True)
-            # Cleanup on failure
-            if dest_image_path.exists():
-                dest_image_path.unlink()
-            if dest_annotation_path.exists():
-                dest_annotation_path.unlink()
+            logger.error("Failed to store labeled image: %s", e, exc_info=True)
+            # Cleanup on failure: only the image this call placed. Annotations
+            # are written atomically, so a failed save leaves nothing behind
+            # and an existing annotation belongs to another request.
+            if created_image:
+                dest_image_path.unlink(missing_ok=True)
             raise IOError(f"Labeled storage failed: {e}") from e
 
+    def _link_or_copy_image(self, source_path: Path, dest_path: Path) -> bool:
+        """
+        Copy an image without pulling its bytes through userspace.
+
+        Stored images are content-addressed and never modified, so a hard
+        link is tried first. Across filesystems, os.copy_file_range is used
+        where available (a reflink on Btrfs/XFS, an in-kernel copy on ext4),
+        falling back to shutil.copy2 when the platform or filesystem does not
+        support it. Copies are staged under a temporary name and renamed into
+        place, so readers never see a partial file.
+
+        Args:
+            source_path: Image to copy
+            dest_path: Destination path
+
+        Returns:
+            True if this call created dest_path, False if it already existed
+            (e.g. a concurrent webhook for the same image got there first)
+        """
+        try:
+            os.link(source_path, dest_path)
+            return True
+        except FileExistsError:
+            return False
+        except OSError as e:
+            # EXDEV: labeled dir on another filesystem; EPERM/ENOTSUP: no
+            # hard links here (e.g. some FUSE / SMB mounts)
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EMLINK):
+                raise
+
+        if dest_path.exists():
+            return False
+
+        fd, temp_name = tempfile.mkstemp(
+            dir=dest_path.parent, prefix=f".{dest_path.name}.", suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            self._copy_file(source_path, Path(temp_name))
+            os.replace(temp_name, dest_path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+        return True
+
+    def _copy_file(self, source_path: Path, dest_path: Path) -> None:
+        """
+        Copy file contents and metadata, in-kernel where supported.
+        """
+        copy_file_range = getattr(os, "copy_file_range", None)
+        if copy_file_range is None:
+            shutil.copy2(str(source_path), str(dest_path))
+            return
+
+        try:
+            with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+        except OSError:
+            # e.g. EXDEV on older kernels or ENOSYS inside some containers
+            shutil.copy2(str(source_path), str(dest_path))
+            return
+
+        # Keep copy2 semantics (mtime is used to order listings)
+        shutil.copystat(str(source_path), str(dest_path))
+
     def _calculate_sha256(self, file_path: Path) -> str:
         """
         Calculate SHA256 hash of file.
 
+        The file is memory-mapped and handed to hashlib in one call, so
+        OpenSSL hashes it without per-chunk Python bytes objects.
+
         Args:
             file_path: Path to file
 
@@ -187,9 +339,13 @@ class StorageService:
         sha256_hash = hashlib.sha256()
 
         with open(file_path, "rb") as f:
-            # Read in chunks for memory efficiency
-            for chunk in iter(lambda: f.read(1024 * 1024), b""):
-                sha256_hash.update(chunk)
+            # Zero-length files cannot be mapped
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # One front-to-back pass: let the kernel read ahead
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    sha256_hash.update(mm)
 
         return sha256_hash.hexdigest()
 
@@ -201,10 +357,52 @@ class StorageService:
             path: Path to save JSON file
             data: Annotation data dictionary
         """
-        import json
+        # Serialized to UTF-8 bytes in one call and written in one syscall,
+        # to a temporary name renamed into place so concurrent webhooks for
+        # the same image never leave a torn or half-deleted file
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+
+        fd, temp_name = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    def _append_annotation_log(self, sha256: str, filename: str, data: Dict[str, Any]) -> None:
+        """
+        Append an annotation to the JSON Lines log next to the per-image files.
+
+        Replaying or exporting all annotations is then one sequential read
+        instead of one open per JSON file. Each record is a single O_APPEND
+        write, so concurrent webhook tasks do not interleave lines. Later
+        lines for the same sha256 supersede earlier ones (updates).
+
+        Args:
+            sha256: SHA256 hash of the image
+            filename: Original filename
+            data: Annotation data dictionary
+        """
+        if not settings.annotation_log_enabled:
+            return
 
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        line = orjson.dumps(
+            {"sha256": sha256, "filename": filename, "annotation": data},
+            option=orjson.OPT_APPEND_NEWLINE
+        )
+        try:
+            fd = os.open(settings.annotation_log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            # The per-image JSON is the source of truth; the log is a convenience
+            logger.warning("Failed to append to annotation log: %s", e)
 
     def list_unlabeled_images(
         self,
@@ -221,27 +419,20 @@ class StorageService:
         Returns:
             List of image information dictionaries
         """
-        images = []
-
-        # Find all image files
-        for ext in settings.allowed_extensions:
-            for image_path in self.unlabeled_dir.rglob(f"*{ext}"):
-                if image_path.is_file():
-                    images.append({
-                        "filename": image_path.name,
-                        "path": str(image_path),
-                        "size_bytes": image_path.stat().st_size,
-                        "modified": image_path.stat().st_mtime
-                    })
-
-        # Sort by modification time (newest first)
-        images.sort(key=lambda x: x["modified"], reverse=True)
-
-        # Apply offset and limit
-        if limit:
-            return images[offset:offset + limit]
-        else:
-            return images[offset:]
+        # Find all image files (single recursive pass, one stat per file)
+        images = self._scan_images(self.unlabeled_dir, recursive=True)
+        page = self._newest_page(images, limit, offset)
+
+        # Only the requested page is turned into response dicts
+        return [
+            {
+                "filename": image.name,
+                "path": image.path,
+                "size_bytes": image.size,
+                "modified": image.mtime
+            }
+            for image in page
+        ]
 
     def list_labeled_images(
         self,
@@ -258,32 +449,130 @@ class StorageService:
         Returns:
             List of labeled image information dictionaries
         """
+        # Find all image files in labeled directory; annotations live in the
+        # same flat directory, so one listing answers both questions
+        labeled = self._scan_images(self.labeled_dir, recursive=False)
+        annotation_names = self._list_annotation_names(self.labeled_dir)
+        page = self._newest_page(labeled, limit, offset)
+
         images = []
+        for image in page:
+            # Check for corresponding annotation
+            annotation_name = os.path.splitext(image.name)[0] + ".json"
+            has_annotation = annotation_name in annotation_names
+
+            images.append({
+                "filename": image.name,
+                "image_path": image.path,
+                "annotation_path": os.path.join(self.labeled_dir, annotation_name) if has_annotation else None,
+                "has_annotation": has_annotation,
+                "size_bytes": image.size,
+                "modified": image.mtime
+            })
+
+        return images
+
+    def _newest_page(
+        self,
+        images: List[ScannedImage],
+        limit: Optional[int],
+        offset: int
+    ) -> List[ScannedImage]:
+        """
+        Select one page of images, newest modification time first.
+
+        With a limit, only the newest offset + limit images are kept in a
+        heap instead of sorting every file.
+
+        Args:
+            images: Scanned images to page through
+            limit: Maximum number of results (None for all)
+            offset: Number of results to skip
+
+        Returns:
+            Images for the requested page
+        """
+        def by_mtime(image):
+            return image.mtime
 
-        # Find all image files in labeled directory
-        for ext in settings.allowed_extensions:
-            for image_path in self.labeled_dir.glob(f"*{ext}"):
-                if image_path.is_file():
-                    # Check for corresponding annotation
-                    annotation_path = image_path.with_suffix('.json')
-
-                    images.append({
-                        "filename": image_path.name,
-                        "image_path": str(image_path),
-                        "annotation_path": str(annotation_path) if annotation_path.exists() else None,
-                        "has_annotation": annotation_path.exists(),
-                        "size_bytes": image_path.stat().st_size,
-                        "modified": image_path.stat().st_mtime
-                    })
-
-        # Sort by modification time (newest first)
-        images.sort(key=lambda x: x["modified"], reverse=True)
-
-        # Apply offset and limit
         if limit:
-            return images[offset:offset + limit]
+            newest = heapq.nlargest(offset + limit, images, key=by_mtime)
         else:
-            return images[offset:]
+            newest = sorted(images, key=by_mtime, reverse=True)
+
+        return newest[offset:]
+
+    def _bump_write_generation(self) -> None:
+        """
+        Invalidate cached scans after a store (safe across request threads).
+        """
+        with self._generation_lock:
+            self._write_generation += 1
+
+    def _scan_images(self, directory: Path, recursive: bool) -> List[ScannedImage]:
+        """
+        Collect image files under directory with os.scandir.
+
+        Filters by extension in a single pass instead of one glob per
+        extension. Results are reused until this service stores another
+        image or storage_scan_ttl_s passes (files added by other processes).
+
+        Args:
+            directory: Directory to scan
+            recursive: Descend into subdirectories (content-addressed layout)
+
+        Returns:
+            List of (name, path, mtime, size) tuples for image files, stat'ed
+            once during the scan
+        """
+        key = (str(directory), recursive)
+        now = time.monotonic()
+        cached = self._scan_cache.get(key)
+        if (
+            cached is not None
+            and cached[0] == self._write_generation
+            and now - cached[1] < settings.storage_scan_ttl_s
+        ):
+            return cached[2]
+
+        generation = self._write_generation
+        extensions = settings.allowed_extensions
+        found: List[ScannedImage] = []
+        pending = [str(directory)]
+
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(entry.path)
+                        elif (
+                            entry.is_file(follow_symlinks=False)
+                            and os.path.splitext(entry.name)[1].lower() in extensions
+                        ):
+                            try:
+                                stat = entry.stat()
+                            except FileNotFoundError:
+                                continue
+                            found.append(ScannedImage(
+                                entry.name, entry.path, stat.st_mtime, stat.st_size
+                            ))
+            except FileNotFoundError:
+                continue
+
+        self._scan_cache[key] = (generation, now, found)
+        return found
+
+    def _list_annotation_names(self, directory: Path) -> set:
+        """
+        Names of annotation JSON files directly inside directory.
+        """
+        try:
+            with os.scandir(directory) as it:
+                return {entry.name for entry in it if entry.name.endswith(".json")}
+        except FileNotFoundError:
+            return set()
 
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -292,26 +581,33 @@ class StorageService:
         Returns:
             Dictionary with storage statistics
         """
-        unlabeled_images = self.list_unlabeled_images()
-        labeled_images = self.list_labeled_images()
-
-        unlabeled_size = sum(img["size_bytes"] for img in unlabeled_images)
-        labeled_size = sum(img["size_bytes"] for img in labeled_images)
+        # Aggregate straight from the directory scan: no per-image dicts,
+        # no sorting, one stat per file
+        unlabeled_entries = self._scan_images(self.unlabeled_dir, recursive=True)
+        labeled_entries = self._scan_images(self.labeled_dir, recursive=False)
+        annotation_names = self._list_annotation_names(self.labeled_dir)
+
+        unlabeled_size = sum(image.size for image in unlabeled_entries)
+        labeled_size = sum(image.size for image in labeled_entries)
+        with_annotations = sum(
+            1 for image in labeled_entries
+            if os.path.splitext(image.name)[0] + ".json" in annotation_names
+        )
 
         return {
             "unlabeled": {
-                "count": len(unlabeled_images),
+                "count": len(unlabeled_entries),
                 "total_size_bytes": unlabeled_size,
                 "total_size_mb": round(unlabeled_size / (1024 * 1024), 2)
             },
             "labeled": {
-                "count": len(labeled_images),
+                "count": len(labeled_entries),
                 "total_size_bytes": labeled_size,
                 "total_size_mb": round(labeled_size / (1024 * 1024), 2),
-                "with_annotations": sum(1 for img in labeled_images if img["has_annotation"])
+                "with_annotations": with_annotations
             },
             "total": {
-                "images": len(unlabeled_images) + len(labeled_images),
+                "images": len(unlabeled_entries) + len(labeled_entries),
                 "size_mb": round((unlabeled_size + labeled_size) / (1024 * 1024), 2)
             }
         }
@@ -2,10 +2,67 @@
 Logging configuration for Server 2 (Label Studio Service)
 Provides structured logging optimized for Raspberry Pi 5
 """
+import atexit
 import logging
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 
+# Format: timestamp - name - level - message
+_FORMATTER = logging.Formatter(
+    fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Records are handed to a listener thread that does the blocking stdout
+# write, so request handlers and the event loop never wait on the terminal /
+# journald. The message and traceback are still rendered in the caller (stock
+# QueueHandler.prepare), so mutable arguments are logged as they were.
+_log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener() -> None:
+    """Start the console listener thread on first use."""
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            # Console handler (stdout for Docker logs)
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(_FORMATTER)
+            _listener = QueueListener(_log_queue, console_handler)
+            _listener.start()
+
+
+def stop_log_listener() -> None:
+    """
+    Flush queued log records and stop the listener thread.
+
+    Called from the application shutdown; safe to call more than once.
+    A record logged afterwards starts a new listener.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(stop_log_listener)
+
+
+class _ListenerQueueHandler(QueueHandler):
+    """QueueHandler that makes sure a listener is draining the queue."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        _ensure_listener()
+        super().enqueue(record)
+
 
 def setup_logger(
     name: str,
@@ -30,21 +87,13 @@ def setup_logger(
     if logger.handlers:
         return logger
 
-    # Format: timestamp - name - level - message
-    formatter = logging.Formatter(
-        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-    # Console handler (stdout for Docker logs)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    # Console output goes through the queue
+    logger.addHandler(_ListenerQueueHandler(_log_queue))
 
     # Optional file handler
     if log_file:
         file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(_FORMATTER)
         logger.addHandler(file_handler)
 
     return logger